@@ -0,0 +1,251 @@
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context, current_app
+
+from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres
+from search import search
+from pagination import clamp_limit
+
+#----------------------------------------------------------------------------#
+# Read-only JSON API.
+#----------------------------------------------------------------------------#
+
+# lists are serialised straight from column tuples (no ORM instances) and
+# streamed while the rows are fetched, so a full export runs in constant memory
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+STREAM_BATCH = 1000
+
+# selectable fields per resource; ?fields=id,name picks a subset
+VENUE_FIELDS = {
+    'id': Venue.id,
+    'name': Venue.name,
+    'city': Venue.city,
+    'state': Venue.state,
+    'address': Venue.address,
+    'phone': Venue.phone,
+    'image_link': Venue.image_link,
+    'website_link': Venue.website_link,
+    'facebook_link': Venue.facebook_link,
+    'seeking_talent': Venue.seeking_talent,
+    'seeking_description': Venue.seeking_description,
+    'updated_at': Venue.updated_at,
+    'upcoming_shows_count': Venue.upcoming_shows_count,
+    'past_shows_count': Venue.past_shows_count,
+    'next_show_at': Venue.next_show_at,
+}
+
+ARTIST_FIELDS = {
+    'id': Artist.id,
+    'name': Artist.name,
+    'city': Artist.city,
+    'state': Artist.state,
+    'phone': Artist.phone,
+    'image_link': Artist.image_link,
+    'website_link': Artist.website_link,
+    'facebook_link': Artist.facebook_link,
+    'updated_at': Artist.updated_at,
+    'upcoming_shows_count': Artist.upcoming_shows_count,
+    'past_shows_count': Artist.past_shows_count,
+    'next_show_at': Artist.next_show_at,
+}
+
+SHOW_FIELDS = {
+    'id': Show.id,
+    'start_time': Show.start_time,
+    'end_time': Show.end_time,
+    'venue_id': Show.venue_id,
+    'venue_name': Venue.name,
+    'venue_image_link': Venue.image_link,
+    'artist_id': Show.artist_id,
+    'artist_name': Artist.name,
+    'artist_image_link': Artist.image_link,
+}
+
+
+class ApiError(Exception):
+
+    def __init__(self, message, status=400):
+        super(ApiError, self).__init__(message)
+        self.message = message
+        self.status = status
+
+
+@api.errorhandler(ApiError)
+def api_error(error):
+    return jsonify({'error': error.message}), error.status
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(repr(value))
+
+
+def dumps(value):
+    return json.dumps(value, default=_default, separators=(',', ':'))
+
+
+def selected_fields(fields):
+    requested = request.args.get('fields')
+    if not requested:
+        return list(fields)
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise ApiError('unknown fields: ' + ', '.join(unknown))
+    return names
+
+
+def stream(query, names):
+    """Stream ``query`` rows as NDJSON (``?format=ndjson``) or one JSON array."""
+    ndjson = request.args.get('format') == 'ndjson'
+    rows = query.yield_per(STREAM_BATCH)
+
+    def generate():
+        try:
+            if not ndjson:
+                yield '['
+            first = True
+            for row in rows:
+                line = dumps(dict(zip(names, row)))
+                if ndjson:
+                    yield line + '\n'
+                else:
+                    yield line if first else ',' + line
+                first = False
+            if not ndjson:
+                yield ']'
+        finally:
+            # the rows are read after the view's app context was torn down
+            # (and its session removed), so nothing else would give the
+            # connection back
+            query.session.close()
+
+    mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+
+def listing(fields, base_query, order_by):
+    names = selected_fields(fields)
+    query = base_query(*[fields[name].label(name) for name in names])
+    limit = request.args.get('limit', type=int)
+    after_id = request.args.get('after_id', type=int)
+    if after_id is not None:
+        query = query.filter(fields['id'] > after_id)
+    query = query.order_by(*order_by)
+    if limit is not None:
+        query = query.limit(max(limit, 0))
+    return stream(query, names)
+
+
+def detail(fields, model, entity_id):
+    names = selected_fields(fields)
+    row = db.session.query(*[fields[name] for name in names]).filter(model.id == entity_id).first()
+    if row is None:
+        raise ApiError('not found', 404)
+    return dict(zip(names, row))
+
+
+def genres_of(owner_id, entity_id):
+    # owner_id is the venue_genres / artist_genres column pointing at the entity
+    return [name for name, in db.session.query(Genre.name).join(
+        owner_id.table, owner_id.table.c.genre_id == Genre.id
+    ).filter(owner_id == entity_id).order_by(Genre.name)]
+
+
+def shows_of(owner_id, other, other_id, prefix, entity_id):
+    # one query, split into past/upcoming against a single "now"
+    rows = db.session.query(Show.id, Show.start_time, other.id, other.name, other.image_link).join(
+        other, other.id == other_id
+    ).filter(owner_id == entity_id).order_by(Show.start_time)
+    now = datetime.now()
+    shows = {'past_shows': [], 'upcoming_shows': []}
+    for show_id, start_time, linked_id, name, image_link in rows:
+        key = 'upcoming_shows' if start_time > now else 'past_shows'
+        shows[key].append({
+            'id': show_id,
+            'start_time': start_time,
+            prefix + '_id': linked_id,
+            prefix + '_name': name,
+            prefix + '_image_link': image_link,
+        })
+    return shows
+
+
+def search_results(model):
+    term = request.args.get('q', '')
+    limit = clamp_limit(request.args.get('limit'), current_app.config['SEARCH_RESULTS_LIMIT'],
+                        current_app.config['MAX_PAGE_SIZE'])
+    data = [{'id': row.id, 'name': row.name} for row in search(model, term, limit)]
+    return jsonify({'count': len(data), 'data': data})
+
+
+def _json(value):
+    return current_app.response_class(dumps(value), mimetype='application/json')
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@api.route('/venues')
+def list_venues():
+    return listing(VENUE_FIELDS, db.session.query, [Venue.id])
+
+
+@api.route('/venues/search')
+def search_venues():
+    return search_results(Venue)
+
+
+@api.route('/venues/<int:venue_id>')
+def get_venue(venue_id):
+    data = detail(VENUE_FIELDS, Venue, venue_id)
+    data['genres'] = genres_of(venue_genres.c.venue_id, venue_id)
+    data.update(shows_of(Show.venue_id, Artist, Show.artist_id, 'artist', venue_id))
+    return _json(data)
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@api.route('/artists')
+def list_artists():
+    return listing(ARTIST_FIELDS, db.session.query, [Artist.id])
+
+
+@api.route('/artists/search')
+def search_artists():
+    return search_results(Artist)
+
+
+@api.route('/artists/<int:artist_id>')
+def get_artist(artist_id):
+    data = detail(ARTIST_FIELDS, Artist, artist_id)
+    data['genres'] = genres_of(artist_genres.c.artist_id, artist_id)
+    data.update(shows_of(Show.artist_id, Venue, Show.venue_id, 'venue', artist_id))
+    return _json(data)
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+def _shows_query(*columns):
+    return db.session.query(*columns).select_from(Show).join(
+        Venue, Venue.id == Show.venue_id).join(Artist, Artist.id == Show.artist_id)
+
+
+@api.route('/shows')
+def list_shows():
+    return listing(SHOW_FIELDS, _shows_query, [Show.id])
+
+
+@api.route('/shows/<int:show_id>')
+def get_show(show_id):
+    names = selected_fields(SHOW_FIELDS)
+    row = _shows_query(*[SHOW_FIELDS[name] for name in names]).filter(Show.id == show_id).first()
+    if row is None:
+        raise ApiError('not found', 404)
+    return _json(dict(zip(names, row)))
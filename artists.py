@@ -0,0 +1,229 @@
+from flask import Blueprint, render_template, request, flash, redirect, url_for
+from sqlalchemy import func
+from sqlalchemy.orm import contains_eager
+
+from models import db, Artist, Venue, Show
+from forms import ArtistForm
+from search import search, update_index
+from conditional import conditional
+from extensions import fragment_cache
+from helpers import paginate, filter_by_upcoming, filter_by_genre, page_version, split_shows
+from routing import read_only
+
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+
+bp = Blueprint('artists', __name__, url_prefix='/artists')
+
+
+def artist_version(artist_id):
+  return page_version(Artist, Artist.updated_at, Show.artist_id, Venue, Show.venue_id, artist_id)
+
+@bp.route('')
+@fragment_cache.cached('pages/artists.html')
+def artists():
+  # TODO: replace with real data returned from querying the database
+
+  artist_rows = filter_by_genre(db.session.query(Artist.id, Artist.name), Artist.genre_list)
+  page = paginate(filter_by_upcoming(artist_rows, Artist), [Artist.id])
+
+  data = {
+    "count":filter_by_upcoming(filter_by_genre(db.session.query(func.count(Artist.id)), Artist.genre_list), Artist).scalar(),
+    "genre":request.args.get('genre'),
+    "upcoming":request.args.get('upcoming'),
+    "artists":page.items,
+    "page":page
+  }
+
+  return render_template('fragments/artists.html', data=data)
+
+@bp.route('/search', methods=['POST'])
+@read_only
+def search_artists():
+  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
+  # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+  # search for "band" should return "The Wild Sax Band".
+
+
+  # ranked, bounded search over name, city and genres
+  data = search(Artist, request.form.get('search_term'))
+
+  # making a response object with count key
+  response = {
+    "count":len(data),
+    "data":data
+  }
+  return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
+
+@bp.route('/<int:artist_id>')
+@conditional(artist_version)
+def show_artist(artist_id):
+  # shows the venue page with the given venue_id
+  # TODO: replace with real venue data from the venues table, using venue_id
+  # data1={
+  #   "id": 4,
+  #   "name": "Guns N Petals",
+  #   "genres": ["Rock n Roll"],
+  #   "city": "San Francisco",
+  #   "state": "CA",
+  #   "phone": "326-123-5000",
+  #   "website": "https://www.gunsnpetalsband.com",
+  #   "facebook_link": "https://www.facebook.com/GunsNPetals",
+  #   "seeking_venue": True,
+  #   "seeking_description": "Looking for shows to perform at in the San Francisco Bay Area!",
+  #   "image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
+  #   "past_shows": [{
+  #     "venue_id": 1,
+  #     "venue_name": "The Musical Hop",
+  #     "venue_image_link": "https://images.unsplash.com/photo-1543900694-133f37abaaa5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=400&q=60",
+  #     "start_time": "2019-05-21T21:30:00.000Z"
+  #   }],
+  #   "upcoming_shows": [],
+  #   "past_shows_count": 1,
+  #   "upcoming_shows_count": 0,
+  # }
+  artist = Artist.query.get(artist_id)
+  
+  if(artist is None):
+    return render_template('errors/404.html')
+  
+  # one query for all the artist's shows, split into past/upcoming in python
+  shows_query = Show.query.join(Venue).options(contains_eager(Show.venue)).filter(Show.artist_id == artist_id).order_by(Show.start_time).all()
+  past_shows, upcoming_shows = split_shows([{
+      'venue_id':show.venue.id,
+      'venue_name':show.venue.name,
+      'venue_image_link':show.venue.image_link,
+      'start_time':show.start_time
+    } for show in shows_query])
+
+  data = {
+    'id':artist.id,
+    'name':artist.name,
+    'city':artist.city,
+    'seeking_venue':False,
+    'seeking_description':'',
+    'state':artist.state,
+    'genres':artist.genres,
+    'phone':artist.phone,
+    'website':artist.website_link,
+    'image_link':artist.image_link,
+    'facebook_link':artist.facebook_link,
+    'upcoming_shows':upcoming_shows,
+    'upcoming_shows_count':len(upcoming_shows),
+    'past_shows':past_shows,
+    'past_shows_count':len(past_shows )
+  }
+
+  return render_template('pages/show_artist.html', artist=data)
+
+#  Update
+#  ----------------------------------------------------------------
+@bp.route('/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+
+  artist = Artist.query.get(artist_id)
+
+  if artist is None:
+    return render_template("errors/404.html")
+  
+  form = ArtistForm(name=artist.name,id=artist.id,
+                    genres=artist.genres,
+                    state=artist.state,city=artist.city,
+                    phone=artist.phone,facebook_link=artist.facebook_link,
+                    image_link=artist.image_link,website_link=artist.website_link)
+  # artist={
+  #   "id": 4,
+  #   "name": "Guns N Petals",
+  #   "genres": ["Rock n Roll"],
+  #   "city": "San Francisco",
+  #   "state": "CA",
+  #   "phone": "326-123-5000",
+  #   "website": "https://www.gunsnpetalsband.com",
+  #   "facebook_link": "https://www.facebook.com/GunsNPetals",
+  #   "seeking_venue": True,
+  #   "seeking_description": "Looking for shows to perform at in the San Francisco Bay Area!",
+  #   "image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80"
+  # }
+  # TODO: populate form with fields from artist with ID <artist_id>
+  return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+@bp.route('/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+  # TODO: take values from the form submitted, and update existing
+  # artist record with ID <artist_id> using the new attributes
+  error = False
+  artist = Artist.query.get(artist_id)
+  form = ArtistForm(request.form,obj=artist)
+  if(form.validate_on_submit()):
+     
+    form.populate_obj(artist)
+    
+  else:
+    return render_template('forms/edit_artist.html', form=form, artist=artist)   
+
+  try:  
+    db.session.commit()
+  except:
+    db.session.rollback()
+    error=True
+  else:
+    update_index(Artist, artist)
+  finally:
+    db.session.close()
+  
+  if(error):
+    flash("Unable to edit Artist " + str(artist_id))
+  else:
+    flash("Artist edited successfully " + str(artist_id))
+
+  return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@bp.route('/create', methods=['GET'])
+def create_artist_form():
+  form = ArtistForm()
+  return render_template('forms/new_artist.html', form=form)
+
+@bp.route('/create', methods=['POST'])
+def create_artist_submission():
+  # called upon submitting the new artist listing form
+  # TODO: insert form data as a new Venue record in the db, instead
+  # TODO: modify data to be the data object returned from db insertion
+  error = False
+  form = ArtistForm(request.form)
+  if(form.validate()):
+    artist = Artist(
+      name = form.name.data,
+      city = form.city.data,
+      state = form.state.data,
+      phone = form.phone.data,
+      genres = form.genres.data,
+      website_link = form.website_link.data,
+      facebook_link = form.facebook_link.data,
+      image_link = form.image_link.data 
+    )
+    try:
+      db.session.add(artist)
+      db.session.commit()
+    except:
+      db.session.rollback()
+      error = True
+    else:
+      update_index(Artist, artist)
+    finally:
+      db.session.close()
+    if(error):
+      flash('Unable to add artist!')
+    else:
+      flash('Artist ' + request.form['name'] + ' successfully listed!')
+  else:
+    return render_template("forms/new_artist.html",form=form)
+
+  return redirect(url_for("index"))
+  # on successful db insert, flash success
+  
+  # TODO: on unsuccessful db insert, flash an error instead.
+  # e.g., flash('An error occurred. Artist ' + data.name + ' could not be listed.')
@@ -0,0 +1,247 @@
+import asyncio
+import io
+import sys
+import threading
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+from werkzeug.exceptions import HTTPException
+
+from app import create_app
+from models import db
+from pool import engine_options, TimedNullPool
+from search import get_backend
+from template_cache import warm_render
+
+#----------------------------------------------------------------------------#
+# ASGI entry point.
+#----------------------------------------------------------------------------#
+
+#   uvicorn asgi:application
+#
+# the read views run on an async engine (asyncpg / aiosqlite): the unchanged
+# Flask view runs inside AsyncSession.run_sync(), where SQLAlchemy turns every
+# statement into an await on the async driver, so one worker keeps serving
+# other requests while a view waits on the database. every other request
+# (writes, streamed API listings, static files) runs on the WSGI app in a
+# thread pool, so it never blocks the event loop either.
+#
+# only the database I/O of the async views is non-blocking: the rest of the
+# view (the fragment cache, Redis included, and Jinja rendering) runs on the
+# event loop thread and holds up the other requests while it works
+
+ASYNC_DRIVERS = {'postgresql': 'asyncpg', 'postgres': 'asyncpg', 'sqlite': 'aiosqlite'}
+
+# endpoints that only read and render a page or a small JSON document
+ASYNC_ENDPOINTS = frozenset([
+    'index', 'venues.venues', 'venues.show_venue', 'venues.search_venues',
+    'artists.artists', 'artists.show_artist', 'artists.search_artists', 'shows.shows',
+    'api.get_venue', 'api.get_artist', 'api.get_show', 'api.search_venues', 'api.search_artists',
+])
+
+# environ key the async requests carry their session in
+SESSION_KEY = 'fyyur.async_session'
+
+# chunks of a streamed WSGI response held while the client is slower than the app
+STREAM_BUFFER = 16
+
+
+def async_database_uri(config):
+    """SQLALCHEMY_ASYNC_DATABASE_URI, or the main database URI with the async driver of its backend."""
+    uri = config.get('SQLALCHEMY_ASYNC_DATABASE_URI')
+    if uri:
+        return uri
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError('no async driver known for {}, set SQLALCHEMY_ASYNC_DATABASE_URI'.format(backend))
+    backend = 'postgresql' if backend == 'postgres' else backend
+    return url.set(drivername='{}+{}'.format(backend, ASYNC_DRIVERS[url.get_backend_name()])).render_as_string(
+        hide_password=False)
+
+
+def async_engine(config):
+    uri = async_database_uri(config)
+    options = engine_options(dict(config, SQLALCHEMY_DATABASE_URI=uri))
+    # the timed pools are synchronous; async engines take their asyncio counterparts
+    poolclass = options.pop('poolclass', None)
+    if poolclass is TimedNullPool:
+        options['poolclass'] = NullPool
+    return create_async_engine(uri, **options)
+
+
+def _use_async_session():
+    # first before_request function: the views' db.session is the request's
+    # greenlet-adapted session
+    from flask import request
+    session = request.environ.get(SESSION_KEY)
+    if session is not None:
+        db.session.registry.set(session)
+
+
+def environ_of(scope, body):
+    """WSGI environ of an ASGI http ``scope`` with its request ``body``."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/{}'.format(scope.get('http_version', '1.1')),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        environ[name] = environ[name] + ',' + value if name in environ else value
+    return environ
+
+
+def _call(wsgi, environ, on_start, on_chunk):
+    # runs the WSGI app: on_start gets the status and the ASGI headers, on_chunk the body
+    def start_response(status, headers, exc_info=None):
+        on_start(int(status.split(' ', 1)[0]),
+                 [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers])
+
+    body = wsgi(environ, start_response)
+    try:
+        for chunk in body:
+            if chunk:
+                on_chunk(chunk)
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+
+
+class AsyncApplication(object):
+    """ASGI application serving ``flask_app``, its read views on an async engine."""
+
+    def __init__(self, flask_app, engine=None):
+        self.flask_app = flask_app
+        self.engine = engine or async_engine(flask_app.config)
+        flask_app.before_request_funcs.setdefault(None, []).insert(0, _use_async_session)
+        flask_app.extensions['async_engine'] = self.engine
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        environ = environ_of(scope, body)
+        if self.is_async(environ):
+            await self.call_async(environ, send)
+        else:
+            await self.call_threaded(environ, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await asyncio.get_running_loop().run_in_executor(None, self.warm)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def warm(self):
+        # loads in-process search indexes and renders the pages once before
+        # the first request needs them
+        with self.flask_app.app_context():
+            backend = get_backend()
+            if hasattr(backend, 'warm'):
+                backend.warm()
+        warm_render(self.flask_app)
+
+    def is_async(self, environ):
+        try:
+            endpoint, _ = self.flask_app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return False
+        return endpoint in ASYNC_ENDPOINTS
+
+    async def call_async(self, environ, send):
+        response = {}
+
+        def dispatch(session):
+            # runs in a greenlet: each query of the view awaits the async driver
+            environ[SESSION_KEY] = session
+            chunks = []
+            _call(self.flask_app, environ, lambda status, headers: response.update(status=status, headers=headers),
+                  chunks.append)
+            response['body'] = b''.join(chunks)
+
+        async with AsyncSession(self.engine) as session:
+            await session.run_sync(dispatch)
+        await send({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+        await send({'type': 'http.response.body', 'body': response['body']})
+
+    async def call_threaded(self, environ, send):
+        # the response is handed over message by message through a bounded
+        # queue, so streamed responses stay streamed and a slow client holds
+        # the worker thread back instead of piling the body up in memory
+        loop = asyncio.get_running_loop()
+        messages = asyncio.Queue(STREAM_BUFFER)
+        closed = threading.Event()
+
+        def put(message):
+            if closed.is_set():
+                # the client went away: stop the app's iteration
+                raise ConnectionAbortedError()
+            asyncio.run_coroutine_threadsafe(messages.put(message), loop).result()
+
+        def run():
+            try:
+                _call(self.flask_app, environ,
+                      lambda status, headers: put({'type': 'http.response.start', 'status': status, 'headers': headers}),
+                      lambda chunk: put({'type': 'http.response.body', 'body': chunk, 'more_body': True}))
+            finally:
+                if not closed.is_set():
+                    put(None)
+
+        worker = loop.run_in_executor(None, run)
+        try:
+            while True:
+                message = await messages.get()
+                if message is None:
+                    break
+                await send(message)
+        except BaseException:
+            closed.set()
+            # unblock a put() waiting on the full queue
+            while not messages.empty():
+                messages.get_nowait()
+            raise
+        # re-raises what the app raised before starting the response
+        await worker
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+def __getattr__(name):
+    # `application` is created on first use, so importing this module for
+    # AsyncApplication (the benchmarks) does not build a second app
+    global application
+    if name != 'application':
+        raise AttributeError(name)
+    application = AsyncApplication(create_app())
+    return application
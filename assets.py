@@ -0,0 +1,283 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+import click
+from flask import Response, abort, current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+#----------------------------------------------------------------------------#
+# Static asset bundles.
+#----------------------------------------------------------------------------#
+
+# `flask assets build` concatenates and minifies each bundle into static/dist
+# under a content-hashed name (css/site.3f2a1b9c04de.css), and copies every
+# other file of static/ (images, fonts, the jQuery fallback) there under a
+# content-hashed name too; text files get .gz and .br variants next to them,
+# and manifest.json maps the original names to the built files. Templates
+# link them with asset_url(), the bundled CSS points its url()s at them.
+# Those files never change under their name, so they are served
+# precompressed and cached for a year. In debug mode, or before a build,
+# bundles are built on every request and files served from static/
+
+assets_cli = AppGroup('assets', help='Static asset bundles.')
+
+# bundle name -> its files under static/, in page order
+BUNDLES = {
+    'css/site.css': (
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+        'css/main.css',
+    ),
+    # loaded in <head>, before the page renders
+    'js/head.js': (
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+    ),
+    # deferred, after jQuery
+    'js/site.js': (
+        'js/script.js',
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+    ),
+    'js/respond.js': (
+        'js/libs/respond-1.4.2.min.js',
+    ),
+}
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+MAX_AGE = 365 * 24 * 3600
+
+# files worth compressing; images and woff fonts already are
+COMPRESSIBLE = ('.css', '.js', '.svg', '.ttf', '.otf', '.eot', '.json')
+
+# precompressed variants, preferred in this order
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_STRING = r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\''
+_COMMENT = re.compile(r'({})|/\*.*?\*/'.format(_STRING), re.S)
+_STRINGS = re.compile(r'({})'.format(_STRING))
+_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def minify_css(css):
+    """Drop comments and the whitespace CSS does not need, leaving strings alone."""
+    css = _COMMENT.sub(lambda match: match.group(1) or '', css)
+    parts = _STRINGS.split(css)
+    for index in range(0, len(parts), 2):
+        code = re.sub(r'\s+', ' ', parts[index])
+        code = re.sub(r'\s*([{};,>])\s*', r'\1', code)
+        code = re.sub(r':\s+', ':', code)
+        parts[index] = code.replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def minify_js(js):
+    """Minify with rjsmin when it is installed, else leave the script as it is.
+
+    Telling a comment from a string, a template literal or a regular
+    expression takes a real tokenizer, so a script is never rewritten without
+    one. The libraries come minified.
+
+    >>> 'a // b' in minify_js("var s = 'a // b';  // note")
+    True
+    >>> '\\n  // b`' in minify_js('var t = `a\\n  // b`;')
+    True
+    """
+    if rjsmin is None:
+        return js
+    return rjsmin.jsmin(js)
+
+
+def rebase_urls(css, source, static_url_path, manifest=None):
+    """Point the relative url()s of ``source`` at their fingerprinted copy in
+    ``manifest``, or at static/, as the bundle lives elsewhere."""
+    manifest = manifest or {}
+
+    def rebase(match):
+        url = match.group(2).strip()
+        if url.startswith(('/', '#', 'data:')) or '//' in url:
+            return match.group(0)
+        # '?#iefix' and '#font-id' suffixes stay as they are
+        path, suffix = re.match(r'([^?#]*)(.*)', url).groups()
+        path = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+        if path in manifest:
+            return 'url("{}/{}/{}{}")'.format(static_url_path, DIST, manifest[path], suffix)
+        return 'url("{}/{}{}")'.format(static_url_path, path, suffix)
+    return _URL.sub(rebase, css)
+
+
+def bundle(app, name, manifest=None):
+    """The contents of bundle ``name``, concatenated and minified."""
+    parts = []
+    for source in BUNDLES[name]:
+        with open(os.path.join(app.static_folder, source), encoding='utf-8') as file:
+            text = file.read()
+        if name.endswith('.css'):
+            text = rebase_urls(text, source, app.static_url_path, manifest)
+            if '.min.' not in source:
+                text = minify_css(text)
+        else:
+            # source maps are not copied into dist; the comment ends the file
+            text = re.sub(r'^//# sourceMappingURL=\S*\s*\Z', '', text, flags=re.M)
+            if '.min.' not in source:
+                text = minify_js(text)
+        parts.append(text.strip())
+    # a script that leaves out its last semicolon must not run into the next one
+    return ('\n' if name.endswith('.css') else '\n;\n').join(parts).encode('utf-8')
+
+
+def static_files(app):
+    """Names under static/ of the files copied into dist, dist itself left out."""
+    for root, directories, files in os.walk(app.static_folder):
+        relative = os.path.relpath(root, app.static_folder)
+        directories[:] = sorted(directory for directory in directories
+                                if not directory.startswith('.') and not (relative == '.' and directory == DIST))
+        for name in sorted(files):
+            # source maps are not copied, their files would no longer match
+            if not name.startswith('.') and not name.endswith('.map'):
+                yield posixpath.normpath(posixpath.join(relative.replace(os.sep, '/'), name))
+
+
+def build(app):
+    """Write every bundle and static file, fingerprinted, to static/dist; returns the manifest.
+
+    Files of earlier builds are left in place: pages cached before a deploy
+    still link them.
+    """
+    dist = os.path.join(app.static_folder, DIST)
+    manifest = {}
+    for name in static_files(app):
+        with open(os.path.join(app.static_folder, name), 'rb') as file:
+            manifest[name] = _emit(dist, name, file.read())
+    # after the files, so the bundled CSS can link their fingerprinted names
+    for name in BUNDLES:
+        manifest[name] = _emit(dist, name, bundle(app, name, manifest))
+    _write(os.path.join(dist, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def _emit(dist, name, data):
+    # writes ``data`` and its compressed variants under its fingerprinted
+    # name; returns that name. files already built have the same content
+    # and are left alone
+    stem, extension = posixpath.splitext(name)
+    built = '{}.{}{}'.format(stem, hashlib.sha256(data).hexdigest()[:12], extension)
+    path = os.path.join(dist, built)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if extension in COMPRESSIBLE:
+        if not os.path.exists(path + '.gz'):
+            _write(path + '.gz', gzip.compress(data, 9, mtime=0))
+        if brotli is not None and not os.path.exists(path + '.br'):
+            _write(path + '.br', brotli.compress(data, quality=11))
+    # last, so a file that exists has its variants
+    if not os.path.exists(path):
+        _write(path, data)
+    return built
+
+
+def _write(path, data):
+    # write and rename, so a running worker never serves half a file
+    with open(path + '.tmp', 'wb') as file:
+        file.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def load_manifest(app):
+    """The manifest of the last build, or {} in debug mode or when nothing is built."""
+    path = os.path.join(app.static_folder, DIST, MANIFEST)
+    if app.debug or not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+
+def init_assets(app):
+    app.extensions['assets'] = load_manifest(app)
+    app.add_url_rule(app.static_url_path + '/' + DIST + '/<path:filename>', endpoint='assets',
+                     view_func=serve_asset)
+    app.add_template_global(asset_url)
+    app.cli.add_command(assets_cli)
+
+
+def asset_url(name):
+    """URL of bundle or static file ``name``, fingerprinted once built."""
+    built = current_app.extensions['assets'].get(name)
+    if built is not None:
+        return url_for('assets', filename=built)
+    if name in BUNDLES:
+        return url_for('assets', filename=name)
+    return url_for('static', filename=name)
+
+
+def serve_asset(filename):
+    dist = os.path.join(current_app.static_folder, DIST)
+    if filename == MANIFEST:
+        abort(404)
+    if os.path.isfile(os.path.join(dist, filename)):
+        return _send_built(dist, filename)
+    if filename in BUNDLES:
+        # not built: bundled on every request, so edits show up on reload
+        response = Response(bundle(current_app, filename), mimetype=mimetypes.guess_type(filename)[0])
+        response.cache_control.no_cache = True
+        response.add_etag()
+        return response.make_conditional(request)
+    abort(404)
+
+
+def _send_built(dist, filename):
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, suffix in ENCODINGS:
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(dist, filename + suffix)):
+            response = send_from_directory(dist, filename + suffix, mimetype=mimetype, max_age=MAX_AGE)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(dist, filename, mimetype=mimetype, max_age=MAX_AGE)
+    if filename.endswith(COMPRESSIBLE):
+        response.vary.add('Accept-Encoding')
+    # content-hashed: a changed file gets a new name
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+#  Commands
+#  ----------------------------------------------------------------
+
+@assets_cli.command('build')
+def build_command():
+    """Bundle, minify, fingerprint and compress the static assets (run at build/deploy time)."""
+    manifest = build(current_app)
+    dist = os.path.join(current_app.static_folder, DIST)
+    for name in sorted(BUNDLES):
+        built = manifest[name]
+        sizes = ['{} B'.format(sum(os.path.getsize(os.path.join(current_app.static_folder, source))
+                                   for source in BUNDLES[name]))]
+        for label, suffix in (('min', ''), ('gzip', '.gz'), ('br', '.br')):
+            if os.path.exists(os.path.join(dist, built + suffix)):
+                sizes.append('{} {} B'.format(label, os.path.getsize(os.path.join(dist, built + suffix))))
+        click.echo('{} -> {}  ({})'.format(name, built, ', '.join(sizes)))
+    click.echo('{} static files fingerprinted'.format(len(manifest) - len(BUNDLES)))
+    if brotli is None:
+        click.echo('brotli is not installed: no .br variants')
+    if rjsmin is None:
+        click.echo('rjsmin is not installed: scripts are bundled unminified')
+    current_app.extensions['assets'] = load_manifest(current_app)
@@ -0,0 +1,229 @@
+"""Compares the sync WSGI and the ASGI serving modes under slow clients.
+
+    python -m benchmarks.async_serving --scale 10k
+    python -m benchmarks.async_serving --no-seed --slow-clients 300 --trickle 5
+    DATABASE_URL=postgresql://localhost/fyyur_bench python -m benchmarks.async_serving --scale 100k
+
+Each mode runs the app in a server subprocess on the same database:
+* wsgi: a WSGI server with a fixed pool of --threads worker threads, each
+  busy with one connection from its first byte to its last, like gunicorn's
+  sync and gthread workers
+* asgi: uvicorn serving asgi:application in one worker, the read views on
+  the async engine (aiosqlite, or asyncpg for Postgres)
+
+--clients fast clients request the read pages back to back while
+--slow-clients connections trickle their request headers over --trickle
+seconds, like clients on bad mobile networks. The report is the latency
+and throughput of the fast clients and how many slow requests completed.
+
+Unless --no-seed is given, the target database is dropped and reseeded,
+never point it at real data.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from sqlalchemy import create_engine, func, select
+
+from models import db, Venue, Artist
+from benchmarks.routes import build_app, percentile
+from benchmarks.seed import seed, SCALES
+
+MODES = ('wsgi', 'asgi')
+
+# read pages the fast clients ask for, picked at random with these weights
+PAGES = [
+    (lambda venues, artists, rng: '/', 1),
+    (lambda venues, artists, rng: '/venues', 2),
+    (lambda venues, artists, rng: '/artists', 2),
+    (lambda venues, artists, rng: '/shows', 2),
+    (lambda venues, artists, rng: '/venues/%d' % rng.randint(1, venues), 4),
+    (lambda venues, artists, rng: '/artists/%d' % rng.randint(1, artists), 4),
+    (lambda venues, artists, rng: '/api/v1/venues/%d' % rng.randint(1, venues), 2),
+]
+
+
+#----------------------------------------------------------------------------#
+# Servers.
+#----------------------------------------------------------------------------#
+
+class PooledWSGIServer(ThreadingMixIn, WSGIServer):
+    """wsgiref server handing each connection to one of a fixed set of threads."""
+
+    def __init__(self, address, handler, threads):
+        WSGIServer.__init__(self, address, handler)
+        self.pool = ThreadPoolExecutor(threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve(mode, url, port, threads):
+    app = build_app(url, cache=True)
+    if mode == 'wsgi':
+        server = make_server('127.0.0.1', port, app, handler_class=QuietHandler,
+                             server_class=lambda address, handler: PooledWSGIServer(address, handler, threads))
+        server.request_queue_size = 1024
+        server.serve_forever()
+    else:
+        import uvicorn
+        from asgi import AsyncApplication
+        # the app built above, so both modes serve the same app
+        uvicorn.run(AsyncApplication(app), host='127.0.0.1', port=port, log_level='warning', backlog=1024)
+
+
+def start_server(mode, url, threads):
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    # every request is slow under this load, keep the slow logs out of the report
+    env = dict({'SLOW_REQUEST_MS': '60000', 'SLOW_QUERY_MS': '60000'}, **os.environ)
+    env['DATABASE_URL'] = url
+    process = subprocess.Popen([sys.executable, '-m', 'benchmarks.async_serving', '--serve', mode,
+                                '--port', str(port), '--threads', str(threads)], env=env)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit('%s server exited with status %d' % (mode, process.returncode))
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit('%s server did not start' % mode)
+
+
+#----------------------------------------------------------------------------#
+# Load.
+#----------------------------------------------------------------------------#
+
+async def request(port, path, trickle=0):
+    """GET ``path`` on a new connection; returns the status code."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        head = ('GET %s HTTP/1.1\r\nHost: 127.0.0.1:%d\r\nUser-Agent: fyyur-bench\r\n'
+                'Accept: text/html\r\nConnection: close\r\n\r\n' % (path, port)).encode('latin-1')
+        if trickle:
+            pieces = 10
+            step = -(-len(head) // pieces)
+            for start in range(0, len(head), step):
+                writer.write(head[start:start + step])
+                await writer.drain()
+                await asyncio.sleep(trickle / pieces)
+        else:
+            writer.write(head)
+            await writer.drain()
+        response = await reader.read()
+        return int(response.split(b' ', 2)[1]) if response else 0
+    finally:
+        writer.close()
+
+
+async def load(port, venues, artists, clients, slow_clients, trickle, duration, timeout):
+    rng = random.Random(1)
+    builders = [build for build, _ in PAGES]
+    weights = [weight for _, weight in PAGES]
+    latencies, errors, slow_done = [], [0], [0]
+    deadline = time.monotonic() + duration
+
+    async def fast_client():
+        while time.monotonic() < deadline:
+            path = rng.choices(builders, weights)[0](venues, artists, rng)
+            started = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(request(port, path), timeout)
+            except (OSError, asyncio.TimeoutError):
+                status = 0
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors[0] += 1
+
+    async def slow_client():
+        while time.monotonic() < deadline:
+            try:
+                status = await asyncio.wait_for(request(port, '/venues', trickle), timeout + trickle)
+            except (OSError, asyncio.TimeoutError):
+                status = 0
+            if status == 200:
+                slow_done[0] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*([fast_client() for _ in range(clients)] + [slow_client() for _ in range(slow_clients)]))
+    return latencies, errors[0], slow_done[0], time.perf_counter() - started
+
+
+def report(results):
+    print('%-6s %9s %9s %9s %9s %8s %7s %6s' % ('mode', 'requests', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms',
+                                               'errors', 'slow'))
+    for mode, (latencies, errors, slow_done, elapsed) in results:
+        if not latencies:
+            print('%-6s %9d %9s %9s %9s %8s %7d %6d' % (mode, 0, '-', '-', '-', '-', errors, slow_done))
+            continue
+        print('%-6s %9d %9.1f %9.1f %9.1f %8.1f %7d %6d' % (
+            mode, len(latencies), len(latencies) / elapsed, percentile(latencies, 0.5) * 1e3,
+            percentile(latencies, 0.95) * 1e3, percentile(latencies, 0.99) * 1e3, errors, slow_done))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES, key=lambda name: SCALES[name][2]), default='10k',
+                        help='number of shows, with venues and artists to match')
+    parser.add_argument('--no-seed', action='store_true', help='reuse the data already in the database')
+    parser.add_argument('--modes', default=','.join(MODES), help='comma separated modes to run')
+    parser.add_argument('--threads', type=int, default=8, help='worker threads of the WSGI server')
+    parser.add_argument('--clients', type=int, default=16, help='fast clients')
+    parser.add_argument('--slow-clients', type=int, default=100)
+    parser.add_argument('--trickle', type=float, default=2.0, help='seconds a slow client takes to send a request')
+    parser.add_argument('--duration', type=float, default=15.0, help='seconds of load per mode')
+    parser.add_argument('--timeout', type=float, default=30.0, help='seconds before a request counts as failed')
+    parser.add_argument('--serve', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    url = os.environ.get('DATABASE_URL', 'sqlite:///' + os.path.abspath('fyyur_bench.db'))
+    if args.serve:
+        return serve(args.serve, url, args.port, args.threads)
+
+    engine = create_engine(url)
+    if not args.no_seed:
+        venues, artists, shows = SCALES[args.scale]
+        db.metadata.drop_all(engine)
+        db.metadata.create_all(engine)
+        seed(engine, venues=venues, artists=artists, shows=shows)
+    with engine.connect() as connection:
+        venues, artists = [connection.scalar(select(func.max(model.id))) or 0 for model in (Venue, Artist)]
+    engine.dispose()
+
+    results = []
+    for mode in args.modes.split(','):
+        process, port = start_server(mode, url, args.threads)
+        try:
+            # one unmeasured pass, so both modes start with warm caches and pools
+            asyncio.run(load(port, venues, artists, args.clients, 0, 0, 2, args.timeout))
+            results.append((mode, asyncio.run(load(port, venues, artists, args.clients, args.slow_clients,
+                                                   args.trickle, args.duration, args.timeout))))
+        finally:
+            process.terminate()
+            process.wait()
+    print('%d fast clients, %d slow clients trickling requests over %.1fs, %d WSGI threads' % (
+        args.clients, args.slow_clients, args.trickle, args.threads))
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
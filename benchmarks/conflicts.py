@@ -0,0 +1,100 @@
+"""Measures booking conflict checks against a large shows table.
+
+    python -m benchmarks.conflicts --shows 1000000
+    DATABASE_URL=postgresql://localhost/fyyur_bench python -m benchmarks.conflicts
+
+Compares the in-memory interval index, the windowed SQL lookup (and the
+tsrange/GiST lookup on PostgreSQL) with a naive overlap query. The target
+database is dropped and recreated, never point it at real data.
+"""
+import argparse
+import os
+import random
+import resource
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import and_, text
+
+from models import db, Show
+from conflicts import Booking, SqlConflictChecker, find_conflicts, CHECKERS
+from benchmarks.seed import seed
+
+
+class NaiveConflictChecker(SqlConflictChecker):
+    # no lower bound on start_time: scans every earlier show of the key
+
+    def condition(self, column, key, start, end):
+        return and_(column == key, Show.start_time < end, Show.end_time > start)
+
+
+def bookings(rng, count, venues, artists):
+    now = datetime.now()
+    return [Booking(rng.randint(1, venues), rng.randint(1, artists), start, start + timedelta(hours=2))
+            for start in (now + timedelta(hours=rng.randint(-24 * 365, 24 * 365)) for _ in range(count))]
+
+
+def timed(check, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = check()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--venues', type=int, default=10000)
+    parser.add_argument('--artists', type=int, default=10000)
+    parser.add_argument('--shows', type=int, default=1000000)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    # absolute, Flask-SQLAlchemy would put a relative SQLite file in the instance folder
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+        'DATABASE_URL', 'sqlite:///' + os.path.abspath('fyyur_bench.db'))
+    db.init_app(app)
+    rng = random.Random(1)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        started = time.perf_counter()
+        seed(db.engine, venues=args.venues, artists=args.artists, shows=args.shows)
+        print('seeded %d shows in %.1fs' % (args.shows, time.perf_counter() - started))
+        names = ['naive', 'sql', 'memory']
+        if db.engine.dialect.name == 'postgresql':
+            # the seeded shows overlap, so index what the exclusion constraints would
+            with db.engine.begin() as connection:
+                connection.execute(text('CREATE EXTENSION IF NOT EXISTS btree_gist'))
+                for column in ('venue_id', 'artist_id'):
+                    connection.execute(text(
+                        'CREATE INDEX ix_bench_shows_{0}_during ON shows '
+                        'USING gist ({0}, tsrange(start_time, end_time))'.format(column)))
+                connection.execute(text('ANALYZE'))
+            names.insert(2, 'postgresql')
+
+        singles = bookings(rng, args.repeat, args.venues, args.artists)
+        batch = bookings(rng, args.batch, args.venues, args.artists)
+        for name in names:
+            app.extensions['conflicts'] = NaiveConflictChecker() if name == 'naive' else CHECKERS[name]()
+            if name == 'memory':
+                rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                started = time.perf_counter()
+                app.extensions['conflicts'].warm()
+                # ru_maxrss is in kilobytes on Linux
+                print('memory: built in %.1fs, peak RSS +%.1f MB' % (
+                    time.perf_counter() - started,
+                    (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1e3))
+            single = iter(singles)
+            elapsed, _ = timed(lambda: find_conflicts([next(single)]), args.repeat)
+            batch_elapsed, conflicts = timed(lambda: find_conflicts(batch), 5)
+            print('%-10s single %8.3f ms   batch of %d %9.1f ms (%d conflicting)' % (
+                name, elapsed, args.batch, batch_elapsed, len(conflicts)))
+            db.session.remove()
+
+
+if __name__ == '__main__':
+    main()
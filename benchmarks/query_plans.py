@@ -0,0 +1,93 @@
+"""Prints the query plans of the hot queries with and without the indexes.
+
+    python -m benchmarks.query_plans --shows 1000000
+    DATABASE_URL=postgresql://localhost/fyyur_bench python -m benchmarks.query_plans
+
+The target database is dropped and recreated, never point it at real data.
+"""
+import argparse
+import os
+
+from sqlalchemy import create_engine, text
+
+from models import db, Venue, Show
+from benchmarks.seed import seed
+
+# the queries the views run, listings fetching their first page (PAGE_SIZE + 1
+# rows); keep them in step with the views
+QUERIES = {
+    # venues.venues(): the upcoming counts come from the venue's counter column
+    'venues directory': '''
+        SELECT venues.id, venues.name, venues.city, venues.state, venues.upcoming_shows_count
+        FROM venues
+        ORDER BY venues.state, venues.city, venues.id
+        LIMIT 51''',
+    # venues.show_venue()
+    'venue detail': '''
+        SELECT shows.start_time, artists.id, artists.name, artists.image_link
+        FROM shows JOIN artists ON artists.id = shows.artist_id
+        WHERE shows.venue_id = :id
+        ORDER BY shows.start_time''',
+    # artists.show_artist()
+    'artist detail': '''
+        SELECT shows.start_time, venues.id, venues.name, venues.image_link
+        FROM shows JOIN venues ON venues.id = shows.venue_id
+        WHERE shows.artist_id = :id
+        ORDER BY shows.start_time''',
+    # shows.shows(): every show, with its venue and artist joined in
+    'shows listing': '''
+        SELECT shows.id, shows.start_time, venues.id, venues.name, artists.id, artists.name, artists.image_link
+        FROM shows JOIN venues ON venues.id = shows.venue_id JOIN artists ON artists.id = shows.artist_id
+        ORDER BY shows.start_time, shows.id
+        LIMIT 51''',
+}
+
+INDEXES = list(Venue.__table__.indexes) + list(Show.__table__.indexes)
+
+
+def explain(connection, sql, params):
+    if connection.dialect.name == 'sqlite':
+        rows = connection.execute(text('EXPLAIN QUERY PLAN ' + sql), params)
+        return [row[-1] for row in rows]
+    rows = connection.execute(text('EXPLAIN ' + sql), params)
+    return [row[0] for row in rows]
+
+
+def print_plans(engine, title):
+    params = {'id': 1}
+    print('== %s ==' % title)
+    with engine.connect() as connection:
+        for name, sql in QUERIES.items():
+            print('-- %s' % name)
+            for line in explain(connection, sql, params):
+                print('   ' + line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--venues', type=int, default=10000)
+    parser.add_argument('--artists', type=int, default=10000)
+    parser.add_argument('--shows', type=int, default=200000)
+    args = parser.parse_args()
+
+    url = os.environ.get('DATABASE_URL', 'sqlite:///fyyur_bench.db')
+    engine = create_engine(url)
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    seed(engine, venues=args.venues, artists=args.artists, shows=args.shows)
+
+    with engine.begin() as connection:
+        for index in INDEXES:
+            index.drop(connection)
+        connection.execute(text('ANALYZE'))
+    print_plans(engine, 'without indexes')
+
+    with engine.begin() as connection:
+        for index in INDEXES:
+            index.create(connection)
+        connection.execute(text('ANALYZE'))
+    print_plans(engine, 'with indexes')
+
+
+if __name__ == '__main__':
+    main()
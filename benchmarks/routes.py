@@ -0,0 +1,392 @@
+"""Drives every route of the app and reports latency, queries per request and memory.
+
+    python -m benchmarks.routes --scale 10k
+    python -m benchmarks.routes --scale 1m --requests 500 --save baseline.json
+    python -m benchmarks.routes --no-seed --compare baseline.json
+    python -m benchmarks.routes --check-queries --scale 10k --requests 20
+    DATABASE_URL=postgresql://localhost/fyyur_bench python -m benchmarks.routes --scale 1m
+
+Requests go through the Flask test client in this process, so the SQL
+statements of each request are counted on the engines and the peak RSS is
+the app's (seeding included, use --no-seed to leave it out). With --url
+the GET routes are requested over HTTP from --concurrency threads instead,
+against a server running on the same database (queries per request then
+come from its Server-Timing header when SERVER_TIMING=1, which leaves out
+the queries of streamed API responses).
+
+Unless --no-seed is given, the target database is dropped and reseeded,
+never point it at real data. --compare exits with status 1 when a route's
+p95 grew by more than --tolerance, or it runs more queries or fails more
+requests than in the baseline.
+
+--check-queries reseeds the database at 1k and at --scale and exits with
+status 1 when the show listing or a venue or artist page does not run the
+same number of SQL statements at both: their shows' venues and artists
+must be loaded with the page, not one by one.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import resource
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.engine import Engine
+
+from models import db, Venue, Artist, Show
+from benchmarks.seed import seed, SCALES, GENRES, NAME_WORDS
+
+# new shows are booked from here on, clear of the seeded ones
+BOOKING_START = datetime(2040, 1, 1, 20, 0)
+
+
+class Context(object):
+    """Ids to request and payloads to post, picked by a seeded random generator."""
+
+    def __init__(self, venues, artists, shows, rng, booking_start=BOOKING_START):
+        self.venues = venues
+        self.artists = artists
+        self.shows = shows
+        self.rng = rng
+        self.booking_start = booking_start
+        self._bookings = 0
+
+    def venue(self):
+        return self.rng.randint(1, self.venues)
+
+    def artist(self):
+        return self.rng.randint(1, self.artists)
+
+    def show(self):
+        return self.rng.randint(1, self.shows)
+
+    def word(self):
+        return self.rng.choice(NAME_WORDS).lower()
+
+    def genre(self):
+        return self.rng.choice(GENRES)
+
+    def booking(self):
+        # every booking gets its own slot, so none conflicts
+        start = self.booking_start + timedelta(hours=4 * self._bookings)
+        self._bookings += 1
+        return {'artist_id': str(self.artist()), 'venue_id': str(self.venue()),
+                'start_time': start.strftime('%Y-%m-%d %H:%M:%S')}
+
+    def venue_form(self, name):
+        return {'name': name, 'city': 'Austin', 'state': 'TX', 'address': '1 Main St', 'phone': '5551234567',
+                'genres': [self.genre()], 'image_link': 'https://images.example.com/v.jpg',
+                'website_link': 'https://venue.example.com', 'facebook_link': 'https://www.facebook.com/venue',
+                'seeking_talent': 'y', 'seeking_description': 'Looking for local acts'}
+
+    def artist_form(self, name):
+        return {'name': name, 'city': 'Austin', 'state': 'TX', 'phone': '5551234567',
+                'genres': [self.genre()], 'image_link': 'https://images.example.com/a.jpg',
+                'website_link': 'https://artist.example.com', 'facebook_link': 'https://www.facebook.com/artist'}
+
+
+# (endpoint, method, request builder returning (path, keyword arguments), expected status)
+ROUTES = [
+    ('index', 'GET', lambda c: ('/', {}), 200),
+    ('venues.venues', 'GET', lambda c: (c.rng.choice(['/venues', '/venues?genre=' + quote(c.genre())]), {}), 200),
+    ('venues.show_venue', 'GET', lambda c: ('/venues/%d' % c.venue(), {}), 200),
+    ('venues.search_venues', 'POST', lambda c: ('/venues/search', {'data': {'search_term': c.word()}}), 200),
+    ('venues.create_venue_form', 'GET', lambda c: ('/venues/create', {}), 200),
+    ('venues.create_venue_submission', 'POST',
+     lambda c: ('/venues/create', {'data': c.venue_form('Bench Venue')}), 302),
+    ('venues.edit_venue', 'GET', lambda c: ('/venues/%d/edit' % c.venue(), {}), 200),
+    ('venues.edit_venue_submission', 'POST', lambda c: (
+        '/venues/%d/edit' % c.venue(), {'data': c.venue_form('Edited Venue')}), 302),
+    ('artists.artists', 'GET', lambda c: (c.rng.choice(['/artists', '/artists?genre=' + quote(c.genre())]), {}), 200),
+    ('artists.show_artist', 'GET', lambda c: ('/artists/%d' % c.artist(), {}), 200),
+    ('artists.search_artists', 'POST', lambda c: ('/artists/search', {'data': {'search_term': c.word()}}), 200),
+    ('artists.create_artist_form', 'GET', lambda c: ('/artists/create', {}), 200),
+    ('artists.create_artist_submission', 'POST',
+     lambda c: ('/artists/create', {'data': c.artist_form('Bench Band')}), 302),
+    ('artists.edit_artist', 'GET', lambda c: ('/artists/%d/edit' % c.artist(), {}), 200),
+    ('artists.edit_artist_submission', 'POST', lambda c: (
+        '/artists/%d/edit' % c.artist(), {'data': c.artist_form('Edited Band')}), 302),
+    ('shows.shows', 'GET', lambda c: ('/shows', {}), 200),
+    ('shows.create_shows', 'GET', lambda c: ('/shows/create', {}), 200),
+    ('shows.create_show_submission', 'POST', lambda c: ('/shows/create', {'data': c.booking()}), 302),
+    ('shows.create_shows_batch', 'POST', lambda c: (
+        '/shows/batch', {'json': [c.booking() for _ in range(10)]}), 201),
+    ('api.list_venues', 'GET', lambda c: ('/api/v1/venues?limit=50', {}), 200),
+    ('api.get_venue', 'GET', lambda c: ('/api/v1/venues/%d' % c.venue(), {}), 200),
+    ('api.search_venues', 'GET', lambda c: ('/api/v1/venues/search?q=' + c.word(), {}), 200),
+    ('api.list_artists', 'GET', lambda c: ('/api/v1/artists?limit=50', {}), 200),
+    ('api.get_artist', 'GET', lambda c: ('/api/v1/artists/%d' % c.artist(), {}), 200),
+    ('api.search_artists', 'GET', lambda c: ('/api/v1/artists/search?q=' + c.word(), {}), 200),
+    ('api.list_shows', 'GET', lambda c: ('/api/v1/shows?limit=50', {}), 200),
+    ('api.get_show', 'GET', lambda c: ('/api/v1/shows/%d' % c.show(), {}), 200),
+    ('cache_stats', 'GET', lambda c: ('/stats/cache', {}), 200),
+    ('pool_stats', 'GET', lambda c: ('/stats/pool', {}), 200),
+    ('metrics_endpoint', 'GET', lambda c: ('/metrics', {}), 200),
+]
+
+# endpoints left out on purpose: files, and delete_venue, which is not
+# implemented (its view returns None, a 500)
+NOT_DRIVEN = {'static', 'assets', 'venues.delete_venue'}
+
+# routes that load the venue and artist of their shows with the page, so
+# their statement count must not grow with the data (--check-queries)
+CONSTANT_QUERY_ROUTES = ('shows.shows', 'venues.show_venue', 'artists.show_artist')
+
+
+def percentile(samples, share):
+    # nearest rank
+    ordered = sorted(samples)
+    return ordered[max(int(round(share * len(ordered))) - 1, 0)]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def build_app(url, cache):
+    # app.py reads config.py when imported, so point it at the benchmark
+    # database first; debug mode off as in production, CSRF off for the posts
+    import config
+    config.SQLALCHEMY_DATABASE_URI = url
+    config.DEBUG = False
+    config.WTF_CSRF_ENABLED = False
+    if not cache:
+        config.CACHE_BACKEND = None
+    from app import create_app
+    return create_app()
+
+
+def drive_client(app, context, routes, requests, warmup):
+    # counted on the engines rather than taken from the profiler, which stops
+    # counting when the view returns and misses streamed API responses
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+    event.listen(Engine, 'after_cursor_execute', count)
+    try:
+        return _drive_client(app, context, routes, requests, warmup, statements)
+    finally:
+        event.remove(Engine, 'after_cursor_execute', count)
+
+
+def _drive_client(app, context, routes, requests, warmup, statements):
+    client = app.test_client()
+    results = {}
+    for endpoint, method, build, expected in routes:
+        latencies, queries, errors = [], [], 0
+        for number in range(warmup + requests):
+            path, kwargs = build(context)
+            del statements[:]
+            started = time.perf_counter()
+            try:
+                response = client.open(path, method=method, **kwargs)
+                # streamed responses run their queries while being read
+                response.get_data()
+                response.close()
+                status = response.status_code
+            except Exception:
+                # debug off, so only errors raised outside the view get here
+                status = None
+            elapsed = time.perf_counter() - started
+            if number < warmup:
+                continue
+            latencies.append(elapsed)
+            queries.append(len(statements))
+            errors += status != expected
+        results[endpoint] = summary(method, latencies, queries, errors)
+    return results
+
+
+def drive_http(base_url, context, routes, requests, warmup, concurrency):
+    def fetch(path):
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base_url.rstrip('/') + path) as response:
+                response.read()
+                status, timing = response.status, response.headers.get('Server-Timing', '')
+        except urllib.error.HTTPError as error:
+            status, timing = error.code, ''
+        except OSError:
+            status, timing = None, ''
+        match = re.search(r'desc="(\d+) queries"', timing)
+        return time.perf_counter() - started, status, int(match.group(1)) if match else None
+
+    results = {}
+    with ThreadPoolExecutor(concurrency) as pool:
+        for endpoint, method, build, expected in routes:
+            if method != 'GET':
+                continue
+            for _ in range(warmup):
+                fetch(build(context)[0])
+            paths = [build(context)[0] for _ in range(requests)]
+            responses = list(pool.map(fetch, paths))
+            results[endpoint] = summary(
+                method, [elapsed for elapsed, _, _ in responses],
+                [queries for _, _, queries in responses if queries is not None],
+                sum(status != expected for _, status, _ in responses))
+    return results
+
+
+def summary(method, latencies, queries, errors):
+    return {
+        'method': method,
+        'requests': len(latencies),
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'queries': float(sum(queries)) / len(queries) if queries else None,
+        'errors': errors,
+    }
+
+
+def report(results, rss):
+    print('%-34s %-6s %6s %9s %9s %9s %8s %7s' % ('route', 'method', 'n', 'p50 ms', 'p95 ms', 'p99 ms',
+                                                  'queries', 'errors'))
+    for endpoint, row in results.items():
+        print('%-34s %-6s %6d %9.2f %9.2f %9.2f %8s %7d' % (
+            endpoint, row['method'], row['requests'], row['p50_ms'], row['p95_ms'], row['p99_ms'],
+            '-' if row['queries'] is None else '%.1f' % row['queries'], row['errors']))
+    if rss is not None:
+        print('peak RSS %.1f MB' % rss)
+
+
+def regressions(results, baseline, tolerance):
+    found = []
+    for endpoint, row in results.items():
+        before = baseline['routes'].get(endpoint)
+        if before is None:
+            continue
+        # a route that starts failing is a regression, however fast it fails
+        if row['errors'] > before.get('errors', 0):
+            found.append('%s: %d errors, was %d' % (endpoint, row['errors'], before.get('errors', 0)))
+        if row['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            found.append('%s: p95 %.2f ms, was %.2f ms' % (endpoint, row['p95_ms'], before['p95_ms']))
+        # averages over random ids wobble a little; a new query per request does not
+        if row['queries'] is not None and before['queries'] is not None and row['queries'] > before['queries'] + 0.5:
+            found.append('%s: %.1f queries per request, was %.1f' % (endpoint, row['queries'], before['queries']))
+    return found
+
+
+def prepare(url, venues, artists, shows, seed_data):
+    """Seed the database unless ``seed_data`` is off; returns the largest ids and the latest show end."""
+    engine = create_engine(url)
+    if seed_data:
+        db.metadata.drop_all(engine)
+        db.metadata.create_all(engine)
+        started = time.perf_counter()
+        seed(engine, venues=venues, artists=artists, shows=shows)
+        print('seeded %d venues, %d artists and %d shows in %.1fs' % (
+            venues, artists, shows, time.perf_counter() - started))
+    with engine.connect() as connection:
+        venues, artists, shows = [connection.scalar(select(func.max(model.id))) or 0
+                                  for model in (Venue, Artist, Show)]
+        # with --no-seed, book after the shows an earlier run posted
+        latest = connection.scalar(select(func.max(Show.end_time)))
+    engine.dispose()
+    return venues, artists, shows, latest
+
+
+def check_constant_queries(url, scales, requests, warmup):
+    """Compare the statements per request of CONSTANT_QUERY_ROUTES across ``scales``.
+
+    The database is reseeded at each scale and the fragment cache is off, so
+    every request renders. Returns the routes whose count differs.
+    """
+    routes = [route for route in ROUTES if route[0] in CONSTANT_QUERY_ROUTES]
+    counts = {}
+    for scale in scales:
+        venues, artists, shows, _ = prepare(url, *SCALES[scale], seed_data=True)
+        app = build_app(url, cache=False)
+        results = drive_client(app, Context(venues, artists, shows, random.Random(1)), routes, requests, warmup)
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+        for endpoint, row in results.items():
+            if row['errors']:
+                raise SystemExit('%s: %d errors at %s' % (endpoint, row['errors'], scale))
+            counts.setdefault(endpoint, []).append(row['queries'])
+            print('%-34s %-4s %5.1f queries per request' % (endpoint, scale, row['queries']))
+    # the counts are averages over random ids: equal only when every request
+    # of the route runs the same number of statements at both scales
+    return ['%s: %s queries per request at %s' % (endpoint, ' vs '.join('%.2f' % count for count in found),
+                                                   ' vs '.join(scales))
+            for endpoint, found in counts.items() if len(set(found)) > 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES, key=lambda name: SCALES[name][2]), default='10k',
+                        help='number of shows, with venues and artists to match')
+    parser.add_argument('--venues', type=int)
+    parser.add_argument('--artists', type=int)
+    parser.add_argument('--shows', type=int)
+    parser.add_argument('--no-seed', action='store_true', help='reuse the data already in the database')
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=10, help='unmeasured requests per route')
+    parser.add_argument('--routes', help='comma separated endpoints to drive, all by default')
+    parser.add_argument('--no-cache', action='store_true', help='turn the fragment cache off')
+    parser.add_argument('--url', help='drive a running server over HTTP instead of the test client')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file written by --save')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 growth over the baseline')
+    parser.add_argument('--check-queries', action='store_true',
+                        help='check that the show listing and detail pages run as many queries at 1k '
+                             'as at --scale, then exit')
+    args = parser.parse_args()
+
+    url = os.environ.get('DATABASE_URL', 'sqlite:///' + os.path.abspath('fyyur_bench.db'))
+    if args.check_queries:
+        found = check_constant_queries(url, ('1k', args.scale), args.requests, args.warmup)
+        for line in found:
+            print('not constant: ' + line)
+        if found:
+            raise SystemExit(1)
+        return
+
+    venues, artists, shows = SCALES[args.scale]
+    venues, artists, shows = args.venues or venues, args.artists or artists, args.shows or shows
+    venues, artists, shows, latest = prepare(url, venues, artists, shows, seed_data=not args.no_seed)
+
+    routes = ROUTES
+    if args.routes:
+        wanted = args.routes.split(',')
+        routes = [route for route in ROUTES if route[0] in wanted]
+    booking_start = BOOKING_START if latest is None else max(BOOKING_START, latest + timedelta(hours=4))
+    context = Context(venues, artists, shows, random.Random(1), booking_start)
+    if args.url:
+        results = drive_http(args.url, context, routes, args.requests, args.warmup, args.concurrency)
+        rss = None
+    else:
+        app = build_app(url, cache=not args.no_cache)
+        missing = set(rule.endpoint for rule in app.url_map.iter_rules()) - set(route[0] for route in ROUTES)
+        missing -= NOT_DRIVEN
+        if missing:
+            print('not driven: %s' % ', '.join(sorted(missing)))
+        results = drive_client(app, context, routes, args.requests, args.warmup)
+        rss = peak_rss_mb()
+    report(results, rss)
+
+    if args.save:
+        with open(args.save, 'w') as target:
+            json.dump({'scale': [venues, artists, shows], 'peak_rss_mb': rss, 'routes': results}, target, indent=2)
+    if args.compare:
+        with open(args.compare) as source:
+            found = regressions(results, json.load(source), args.tolerance)
+        for line in found:
+            print('regression: ' + line)
+        if found:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
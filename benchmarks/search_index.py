@@ -0,0 +1,48 @@
+"""Measures build time, memory and lookup latency of the in-memory search index.
+
+    python -m benchmarks.search_index --entities 1000000
+"""
+import argparse
+import random
+import time
+import resource
+
+from search_index import NgramIndex
+from benchmarks.seed import CITIES, GENRES
+
+WORDS = ['the', 'club', 'hall', 'lounge', 'jazz', 'blue', 'velvet', 'room', 'garden',
+         'park', 'square', 'music', 'live', 'coffee', 'band', 'trio', 'sound', 'house']
+
+TERMS = ['jazz', 'velvet room', 'club 99', 'ou', 'lounge 12345', 'francisco', 'zzz', 'ky', 'q']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entities', type=int, default=200000)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    index = NgramIndex()
+    for doc_id in range(1, args.entities + 1):
+        name = '%s %s %d' % (rng.choice(WORDS).title(), rng.choice(WORDS).title(), doc_id)
+        city, state = rng.choice(CITIES)
+        index.add(doc_id, name, city, ','.join(rng.sample(GENRES, 2)))
+    build = time.perf_counter() - started
+    # ru_maxrss is in kilobytes on Linux
+    memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    print('built %d entities in %.1fs, peak RSS +%.1f MB' % (args.entities, build, memory / 1e3))
+
+    for term in TERMS:
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            results = index.search(term, args.limit)
+        elapsed = (time.perf_counter() - started) / args.repeat
+        print('%-14r %4d results  %8.3f ms' % (term, len(results), elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
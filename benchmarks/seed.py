@@ -0,0 +1,147 @@
+import itertools
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from models import Venue, Artist, Show, Genre, venue_genres, artist_genres
+from show_counts import rebuild
+
+#----------------------------------------------------------------------------#
+# Synthetic data for benchmarks.
+#----------------------------------------------------------------------------#
+
+CITIES = [
+    ('San Francisco', 'CA'), ('Los Angeles', 'CA'), ('New York', 'NY'),
+    ('Austin', 'TX'), ('Houston', 'TX'), ('Chicago', 'IL'), ('Seattle', 'WA'),
+    ('Nashville', 'TN'), ('New Orleans', 'LA'), ('Denver', 'CO'),
+]
+
+# rough share of live music venues, so the big cities dominate the directory
+CITY_WEIGHTS = [8, 14, 20, 9, 6, 11, 7, 10, 8, 7]
+
+GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk',
+          'Funk', 'Hip-Hop', 'Heavy Metal', 'Jazz', 'Pop', 'Punk', 'Rock n Roll', 'Soul']
+
+GENRE_WEIGHTS = [8, 5, 3, 7, 9, 5, 3, 10, 4, 6, 12, 4, 11, 5]
+
+# words for names, so searches match some rows but not all of them
+NAME_WORDS = ['Blue', 'Red', 'Golden', 'Velvet', 'Electric', 'Midnight', 'Wild', 'Silver',
+              'Lantern', 'Hop', 'Room', 'Hall', 'Garden', 'Tavern', 'Club', 'Lounge',
+              'Band', 'Collective', 'Trio', 'Sound', 'Kings', 'Echo', 'Riot', 'Fox']
+
+# shows mostly start in the evening and on weekends, and last 1.5 to 3 hours
+SHOW_HOURS = [17, 18, 19, 20, 21, 22, 23]
+SHOW_HOUR_WEIGHTS = [3, 8, 20, 30, 22, 12, 5]
+WEEKDAY_WEIGHTS = [5, 6, 9, 13, 22, 27, 18]
+SHOW_LENGTHS = [timedelta(minutes=minutes) for minutes in (90, 120, 150, 180)]
+
+# scale presets for --scale: (venues, artists, shows)
+SCALES = {
+    '1k': (100, 200, 1000),
+    '10k': (500, 1000, 10000),
+    '100k': (2000, 5000, 100000),
+    '1m': (10000, 25000, 1000000),
+    '10m': (50000, 150000, 10000000),
+}
+
+BATCH_SIZE = 10000
+
+
+def _insert(connection, table, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            connection.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        connection.execute(table.insert(), batch)
+
+
+def _skewed(rng, count, power):
+    # ids near 1 are picked far more often: a few venues and artists host or
+    # play most shows, like in real listings
+    return int(count * rng.random() ** power) + 1
+
+
+def seed(engine, venues=1000, artists=1000, shows=10000, rng=None, past=0.6, days=365):
+    """Bulk insert ``venues``/``artists``/``shows`` rows into empty tables.
+
+    ``past`` is the share of shows that already happened; shows spread over
+    ``days`` days on both sides of now.
+    """
+    rng = rng or random.Random(0)
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    cities = list(itertools.accumulate(CITY_WEIGHTS))
+    genre_weights = list(itertools.accumulate(GENRE_WEIGHTS))
+
+    def name(i, suffix):
+        return '%s %s %s %d' % (rng.choice(NAME_WORDS), rng.choice(NAME_WORDS), suffix, i)
+
+    def venue_rows():
+        for i in range(1, venues + 1):
+            city, state = rng.choices(CITIES, cum_weights=cities)[0]
+            seeking = rng.random() < 0.3
+            yield {
+                'id': i, 'name': name(i, 'Venue'), 'city': city, 'state': state,
+                'address': '%d Main St' % i, 'phone': '555%07d' % i,
+                'image_link': 'https://images.example.com/venues/%d.jpg' % i,
+                'website_link': 'https://venue%d.example.com' % i,
+                'facebook_link': 'https://www.facebook.com/venue%d' % i,
+                'seeking_talent': seeking,
+                'seeking_description': 'Looking for local acts' if seeking else None,
+            }
+
+    def artist_rows():
+        for i in range(1, artists + 1):
+            city, state = rng.choices(CITIES, cum_weights=cities)[0]
+            yield {
+                'id': i, 'name': name(i, 'Band'), 'city': city, 'state': state,
+                'phone': '555%07d' % i,
+                'image_link': 'https://images.example.com/artists/%d.jpg' % i,
+                'website_link': 'https://artist%d.example.com' % i,
+                'facebook_link': 'https://www.facebook.com/artist%d' % i,
+            }
+
+    def genre_links(owner, count):
+        for i in range(1, count + 1):
+            # one to three genres, popular ones more often
+            picked = set(rng.choices(range(1, len(GENRES) + 1), cum_weights=genre_weights, k=rng.randint(1, 3)))
+            for genre_id in picked:
+                yield {owner: i, 'genre_id': genre_id}
+
+    def start_time():
+        past_day = rng.random() < past
+        while True:
+            offset = rng.randint(1, days)
+            day = now - timedelta(days=offset) if past_day else now + timedelta(days=offset)
+            if rng.random() * max(WEEKDAY_WEIGHTS) < WEEKDAY_WEIGHTS[day.weekday()]:
+                break
+        hour = rng.choices(SHOW_HOURS, weights=SHOW_HOUR_WEIGHTS)[0]
+        return day.replace(hour=hour, minute=rng.choice((0, 0, 0, 30)))
+
+    def show_rows():
+        for i in range(1, shows + 1):
+            start = start_time()
+            yield {
+                'id': i,
+                'venue_id': _skewed(rng, venues, 1.5),
+                'artist_id': _skewed(rng, artists, 2),
+                'start_time': start,
+                'end_time': start + rng.choice(SHOW_LENGTHS),
+            }
+
+    with engine.begin() as connection:
+        _insert(connection, Genre.__table__, ({'id': i, 'name': genre} for i, genre in enumerate(GENRES, 1)))
+        _insert(connection, Venue.__table__, venue_rows())
+        _insert(connection, Artist.__table__, artist_rows())
+        _insert(connection, venue_genres, genre_links('venue_id', venues))
+        _insert(connection, artist_genres, genre_links('artist_id', artists))
+        _insert(connection, Show.__table__, show_rows())
+        rebuild(connection)
+        if connection.dialect.name == 'postgresql':
+            # the rows were inserted with explicit ids; new rows continue after them
+            for table in ('genres', 'venues', 'artists', 'shows'):
+                connection.execute(text(
+                    "SELECT setval(pg_get_serial_sequence('{0}', 'id'), (SELECT max(id) FROM {0}))".format(table)))
@@ -0,0 +1,120 @@
+"""Measures how long a fresh process takes to import and create the app.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 20 --save startup.json
+    python -m benchmarks.startup --compare startup.json
+
+Every run is a new interpreter started with ``python -X importtime``, the
+way a worker, an autoscaled instance or a ``flask`` CLI invocation starts.
+The report gives the median time to import app.py, to run create_app() and
+for the whole process, and the packages that cost the most import time,
+their modules' own times summed. --compare exits with status 1 when the
+median import or create_app() time grew by more than --tolerance.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# runs in the measured interpreter; its last line of output is the timings
+PROGRAM = '''
+import time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print('%f %f' % (imported - started, created - imported))
+'''
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_once(env):
+    started = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROGRAM], cwd=PACKAGE_ROOT, env=env,
+                             capture_output=True, text=True)
+    total = time.perf_counter() - started
+    if process.returncode:
+        raise SystemExit(process.stderr)
+    import_time, create_time = [float(value) for value in process.stdout.split()[-2:]]
+    return import_time, create_time, total, parse_importtime(process.stderr)
+
+
+def parse_importtime(output):
+    """Seconds of import time per top-level package, from ``-X importtime`` output."""
+    packages = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, _, name = line[len('import time:'):].split('|', 2)
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(own) / 1e6
+    return packages
+
+
+def measure(runs, env):
+    results = [run_once(env) for _ in range(runs)]
+    packages = {}
+    for result in results:
+        for package, seconds in result[3].items():
+            packages.setdefault(package, []).append(seconds)
+    return {
+        'import_s': statistics.median(result[0] for result in results),
+        'create_app_s': statistics.median(result[1] for result in results),
+        'process_s': statistics.median(result[2] for result in results),
+        'packages': dict((package, statistics.median(times)) for package, times in packages.items()),
+    }
+
+
+def report(results, top):
+    print('import app   %8.1f ms' % (results['import_s'] * 1e3))
+    print('create_app() %8.1f ms' % (results['create_app_s'] * 1e3))
+    print('process      %8.1f ms' % (results['process_s'] * 1e3))
+    print('\n%-24s %9s' % ('package', 'import ms'))
+    for package, seconds in sorted(results['packages'].items(), key=lambda item: -item[1])[:top]:
+        print('%-24s %9.1f' % (package, seconds * 1e3))
+
+
+def regressions(results, baseline, tolerance):
+    found = []
+    for key in ('import_s', 'create_app_s'):
+        if results[key] > baseline[key] * (1 + tolerance):
+            found.append('%s %.1f ms, was %.1f ms' % (key, results[key] * 1e3, baseline[key] * 1e3))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='fresh processes to start')
+    parser.add_argument('--top', type=int, default=15, help='packages to list')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file written by --save')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed growth over the baseline')
+    args = parser.parse_args()
+
+    # create_app() only creates the engines, it does not connect
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'sqlite:///' + os.path.abspath('fyyur_bench.db'))
+    # the first run also fills __pycache__, which deployed code already has
+    run_once(env)
+    results = measure(args.runs, env)
+    report(results, args.top)
+
+    if args.save:
+        with open(args.save, 'w') as target:
+            json.dump(results, target, indent=2)
+    if args.compare:
+        with open(args.compare) as source:
+            found = regressions(results, json.load(source), args.tolerance)
+        for line in found:
+            print('regression: ' + line)
+        if found:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
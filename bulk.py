@@ -0,0 +1,319 @@
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from flask_wtf import FlaskForm
+from sqlalchemy import select
+
+from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres
+from forms import VenueForm, ArtistForm, ShowForm, existing_references, formdata
+from conflicts import Booking, find_conflicts, describe, record_shows
+from show_counts import shows_added
+
+#----------------------------------------------------------------------------#
+# Bulk import / export.
+#----------------------------------------------------------------------------#
+
+# rows are validated with the same forms as the web handlers, then written a
+# batch at a time with executemany (or COPY for shows on PostgreSQL), one
+# transaction per batch
+
+data_cli = AppGroup('data', help='Bulk import and export of venues, artists and shows.')
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class _BulkShowForm(ShowForm):
+    # artist/venue existence and booking conflicts are checked once per batch
+    # instead of per row
+
+    def validate(self, extra_validators=None):
+        return FlaskForm.validate(self, extra_validators)
+
+
+class Kind(object):
+
+    def __init__(self, model, form, fields, links=None, owner=None):
+        self.model = model
+        self.form = form
+        self.fields = fields
+        self.links = links
+        self.owner = owner
+
+    @property
+    def table(self):
+        return self.model.__table__
+
+
+VENUE_COLUMNS = ['name', 'city', 'state', 'address', 'phone', 'image_link', 'website_link',
+                 'facebook_link', 'seeking_talent', 'seeking_description']
+ARTIST_COLUMNS = ['name', 'city', 'state', 'phone', 'image_link', 'website_link', 'facebook_link']
+SHOW_COLUMNS = ['artist_id', 'venue_id', 'start_time', 'end_time']
+
+KINDS = {
+    'venues': Kind(Venue, VenueForm, VENUE_COLUMNS, venue_genres, 'venue_id'),
+    'artists': Kind(Artist, ArtistForm, ARTIST_COLUMNS, artist_genres, 'artist_id'),
+    'shows': Kind(Show, _BulkShowForm, SHOW_COLUMNS),
+}
+
+
+class RowError(ValueError):
+
+    def __init__(self, line, errors):
+        super(RowError, self).__init__('line {}: {}'.format(line, errors))
+        self.line = line
+        self.errors = errors
+
+
+#  Reading
+#  ----------------------------------------------------------------
+
+def _format_of(path, fmt):
+    if fmt:
+        return fmt
+    return 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+def read_records(stream, fmt):
+    # yields (line number, dict) pairs; a line that is not a JSON object
+    # yields a RowError in place of the dict, reported like an invalid row
+    if fmt == 'ndjson':
+        for line, text in enumerate(stream, 1):
+            if not text.strip():
+                continue
+            try:
+                record = json.loads(text)
+            except ValueError as error:
+                yield line, RowError(line, {'line': ['Invalid JSON: {}'.format(error)]})
+                continue
+            if not isinstance(record, dict):
+                yield line, RowError(line, {'line': ['Expected a JSON object']})
+                continue
+            yield line, record
+    else:
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+
+
+def validate(kind, line, record):
+    if kind.model is Show and not record.get('start_time'):
+        # the form would silently fall back to its default start time
+        raise RowError(line, {'start_time': ['This field is required.']})
+    form = kind.form(formdata=formdata(record), meta={'csrf': False})
+    if not form.validate():
+        raise RowError(line, form.errors)
+    values = dict((name, form[name].data) for name in kind.fields)
+    if kind.model is Show:
+        booking = form.booking()
+        values.update(artist_id=booking.artist_id, venue_id=booking.venue_id, end_time=booking.end_time)
+    genres = form.genres.data if kind.links is not None else None
+    return values, genres
+
+
+#  Writing
+#  ----------------------------------------------------------------
+
+def _genre_ids(connection, names, known):
+    missing = sorted(set(names) - set(known))
+    if missing:
+        inserted = connection.execute(
+            Genre.__table__.insert().returning(Genre.id, Genre.name, sort_by_parameter_order=True),
+            [{'name': name} for name in missing])
+        for genre_id, name in inserted:
+            known[name] = genre_id
+    return known
+
+
+def _copy_shows(connection, rows):
+    # COPY is several times faster than INSERT on PostgreSQL; needs psycopg2
+    cursor = connection.connection.cursor()
+    if not hasattr(cursor, 'copy_expert'):
+        return False
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    now = datetime.utcnow()
+    for row in rows:
+        writer.writerow([row['artist_id'], row['venue_id'], row['start_time'].strftime(DATETIME_FORMAT),
+                         row['end_time'].strftime(DATETIME_FORMAT), now])
+    buffer.seek(0)
+    cursor.copy_expert('COPY shows (artist_id, venue_id, start_time, end_time, updated_at) '
+                       'FROM STDIN WITH (FORMAT csv)', buffer)
+    return True
+
+
+def _bookable(connection, batch, errors):
+    # the rows of ``batch`` whose artist and venue exist and that do not
+    # overlap a stored show or an earlier row
+    artists, venues = existing_references([values['artist_id'] for _, values, _ in batch],
+                                          [values['venue_id'] for _, values, _ in batch], connection)
+    candidates = []
+    for line, values, _ in batch:
+        if values['artist_id'] not in artists:
+            errors.append(RowError(line, {'artist_id': ['Artist does not exists']}))
+        elif values['venue_id'] not in venues:
+            errors.append(RowError(line, {'venue_id': ['Venue does not exists']}))
+        else:
+            candidates.append((line, values))
+    conflicts = find_conflicts([Booking(values['venue_id'], values['artist_id'], values['start_time'],
+                                        values['end_time']) for _, values in candidates], connection)
+    rows = []
+    for index, (line, values) in enumerate(candidates):
+        if index in conflicts:
+            errors.append(RowError(line, {'start_time': [describe(conflict) for conflict in conflicts[index]]}))
+        else:
+            rows.append(values)
+    return rows
+
+
+def write_batch(connection, kind, batch, known_genres, errors):
+    """Insert one validated batch; returns the new ids (shows: the new rows)."""
+    if kind.model is Show:
+        rows = _bookable(connection, batch, errors)
+        if not rows:
+            return []
+        if connection.dialect.name == 'postgresql' and _copy_shows(connection, rows):
+            ids = [None] * len(rows)
+        else:
+            ids = connection.execute(
+                kind.table.insert().returning(Show.id, sort_by_parameter_order=True), rows).scalars().all()
+        # core inserts skip the session events, count the shows in the same transaction
+        shows_added(connection, [(row['venue_id'], row['artist_id'], row['start_time']) for row in rows])
+        return [(show_id, row['venue_id'], row['artist_id'], row['start_time'], row['end_time'])
+                for show_id, row in zip(ids, rows)]
+
+    _genre_ids(connection, [name for _, _, genres in batch for name in genres], known_genres)
+    ids = connection.execute(
+        kind.table.insert().returning(kind.model.id, sort_by_parameter_order=True),
+        [values for _, values, _ in batch]).scalars().all()
+    links = [{kind.owner: entity_id, 'genre_id': known_genres[name]}
+             for entity_id, (_, _, genres) in zip(ids, batch) for name in set(genres)]
+    if links:
+        connection.execute(kind.links.insert(), links)
+    return ids
+
+
+def import_records(kind, records, batch_size=5000):
+    """Validate and insert ``records`` of (line, dict); returns (inserted, errors)."""
+    inserted = 0
+    errors = []
+    known_genres = dict((name, genre_id) for genre_id, name in
+                        db.session.execute(select(Genre.id, Genre.name)))
+    batch = []
+
+    def flush():
+        with db.engine.begin() as connection:
+            written = write_batch(connection, kind, batch, known_genres, errors)
+        if kind.model is Show:
+            record_shows(written)
+        return len(written)
+
+    for line, record in records:
+        if isinstance(record, RowError):
+            errors.append(record)
+            continue
+        try:
+            values, genres = validate(kind, line, record)
+        except RowError as error:
+            errors.append(error)
+            continue
+        batch.append((line, values, genres))
+        if len(batch) >= batch_size:
+            inserted += flush()
+            batch = []
+    if batch:
+        inserted += flush()
+    return inserted, errors
+
+
+#  Exporting
+#  ----------------------------------------------------------------
+
+def export_rows(kind, batch_size=5000):
+    # yields dicts in id order; genres are fetched per batch, not per row
+    columns = [kind.model.id] + [getattr(kind.model, name) for name in kind.fields]
+    names = ['id'] + kind.fields
+    batch = []
+    for row in db.session.query(*columns).order_by(kind.model.id).yield_per(batch_size):
+        batch.append(dict(zip(names, row)))
+        if len(batch) == batch_size:
+            for record in _with_genres(kind, batch):
+                yield record
+            batch = []
+    for record in _with_genres(kind, batch):
+        yield record
+
+
+def _with_genres(kind, batch):
+    if kind.links is None or not batch:
+        return batch
+    owner = kind.links.c[kind.owner]
+    genres = {}
+    rows = db.session.query(owner, Genre.name).join(Genre, Genre.id == kind.links.c.genre_id).filter(
+        owner.in_([record['id'] for record in batch])).order_by(Genre.name)
+    for owner_id, name in rows:
+        genres.setdefault(owner_id, []).append(name)
+    for record in batch:
+        record['genres'] = genres.get(record['id'], [])
+    return batch
+
+
+def write_records(records, stream, fmt, names):
+    if fmt == 'ndjson':
+        for record in records:
+            stream.write(json.dumps(record, default=lambda value: value.strftime(DATETIME_FORMAT)) + '\n')
+        return
+    writer = csv.DictWriter(stream, fieldnames=names)
+    writer.writeheader()
+    for record in records:
+        if 'genres' in record:
+            record['genres'] = ','.join(record['genres'])
+        for key, value in record.items():
+            if isinstance(value, datetime):
+                record[key] = value.strftime(DATETIME_FORMAT)
+        writer.writerow(record)
+
+
+#  Commands
+#  ----------------------------------------------------------------
+
+@data_cli.command('import')
+@click.argument('kind', type=click.Choice(sorted(KINDS)))
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension.')
+@click.option('--batch-size', default=5000, show_default=True)
+def import_command(kind, source, fmt, batch_size):
+    """Load venues, artists or shows from a CSV or NDJSON file."""
+    fmt = _format_of(source, fmt)
+    with open(source, newline='', encoding='utf-8') as stream:
+        inserted, errors = import_records(KINDS[kind], read_records(stream, fmt), batch_size)
+    for error in sorted(errors, key=lambda error: error.line):
+        click.echo(str(error), err=True)
+    # bulk inserts bypass the ORM session events that invalidate the cache
+    current_app.extensions['fragment_cache'].clear()
+    click.echo('{} {} imported, {} rejected'.format(inserted, kind, len(errors)))
+    if errors:
+        sys.exit(1)
+
+
+@data_cli.command('export')
+@click.argument('kind', type=click.Choice(sorted(KINDS)))
+@click.argument('target', default='-')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension.')
+@click.option('--batch-size', default=5000, show_default=True)
+def export_command(kind, target, fmt, batch_size):
+    """Write all venues, artists or shows to a CSV or NDJSON file ('-' for stdout)."""
+    fmt = _format_of(target, fmt)
+    spec = KINDS[kind]
+    names = ['id'] + spec.fields + (['genres'] if spec.links is not None else [])
+    records = export_rows(spec, batch_size)
+    if target == '-':
+        write_records(records, sys.stdout, fmt, names)
+    else:
+        with open(target, 'w', newline='', encoding='utf-8') as stream:
+            write_records(records, stream, fmt, names)
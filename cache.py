@@ -0,0 +1,177 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, render_template
+from markupsafe import Markup
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from metrics import Counter
+
+#----------------------------------------------------------------------------#
+# Rendered-fragment cache.
+#----------------------------------------------------------------------------#
+
+
+class LRUCache(object):
+    """In-process cache: least recently used entries go first, all expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache(object):
+    """Cache shared by every worker through a Redis-compatible server.
+
+    ``clear()`` bumps a generation counter that is part of every key instead
+    of deleting keys, so invalidation is one round trip and stale entries
+    simply expire. Any client with ``get``/``set(ex=)``/``incr`` will do,
+    which lets tests pass a local stand-in.
+    """
+
+    def __init__(self, client=None, url=None, ttl=60, prefix='fyyur:fragment:'):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, key):
+        generation = self.client.get(self.prefix + 'generation') or b'0'
+        if isinstance(generation, bytes):
+            generation = generation.decode('ascii')
+        return '{}{}:{}'.format(self.prefix, generation, key)
+
+    def get(self, key):
+        value = self.client.get(self._key(key))
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return value
+
+    def set(self, key, value):
+        self.client.set(self._key(key), value, ex=self.ttl)
+
+    def clear(self):
+        self.client.incr(self.prefix + 'generation')
+
+
+class FragmentCache(object):
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.models = ()
+        # per-thread counters, no lock on the hot path
+        self.hits = Counter('fyyur_fragment_cache_hits_total', 'Fragment cache lookups that hit.')
+        self.misses = Counter('fyyur_fragment_cache_misses_total', 'Fragment cache lookups that missed.')
+        self.settle = 0
+        self._settled_at = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('CACHE_BACKEND')
+        ttl = app.config.get('CACHE_TTL', 60)
+        if backend == 'memory':
+            self.backend = LRUCache(app.config.get('CACHE_MAX_ENTRIES', 1024), ttl)
+        elif backend == 'redis':
+            self.backend = RedisCache(url=app.config['CACHE_REDIS_URL'], ttl=ttl)
+        if app.config.get('SQLALCHEMY_REPLICA_URIS'):
+            # right after a write the replicas may still serve the old data;
+            # pages rendered meanwhile are not stored
+            self.settle = app.config.get('REPLICA_READ_YOUR_WRITES', 5)
+        app.extensions['fragment_cache'] = self
+
+    def invalidate_on_commit(self, *models):
+        """Clear the cache whenever a commit changed an instance of ``models``."""
+        self.models = models
+        # once per process, however many apps are created
+        for name, listener in (('after_flush', self._after_flush), ('after_commit', self._after_commit),
+                               ('after_soft_rollback', self._after_soft_rollback)):
+            if not event.contains(Session, name, listener):
+                event.listen(Session, name, listener)
+
+    def _after_flush(self, session, flush_context):
+        for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(instance, self.models):
+                session.info['fragment_cache_stale'] = True
+                return
+
+    def _after_commit(self, session):
+        if session.info.pop('fragment_cache_stale', False):
+            self.clear()
+
+    def _after_soft_rollback(self, session, previous_transaction):
+        session.info.pop('fragment_cache_stale', None)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+            self._settled_at = time.monotonic() + self.settle
+
+    def get_or_render(self, key, render):
+        if self.backend is None:
+            return render()
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits.inc()
+            return value
+        self.misses.inc()
+        value = render()
+        if time.monotonic() >= self._settled_at:
+            self.backend.set(key, value)
+        return value
+
+    def stats(self):
+        hits, misses = self.hits.value(), self.misses.value()
+        lookups = hits + misses
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': float(hits) / lookups if lookups else None,
+        }
+
+    def cached(self, page_template):
+        """Cache what the view renders, keyed by path and query string.
+
+        The view returns only its fragment (the page content); it is served
+        inside ``page_template`` as ``content``, which is rendered per
+        request so flashed messages and CSRF tokens in the layout stay fresh.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = '{}?{}'.format(request.path, request.query_string.decode('utf-8'))
+                content = self.get_or_render(key, lambda: view(*args, **kwargs))
+                return render_template(page_template, content=Markup(content))
+            return wrapper
+        return decorator
@@ -0,0 +1,60 @@
+import hashlib
+import time
+from functools import wraps
+
+from flask import request, session, current_app, make_response
+from flask_wtf.csrf import generate_csrf
+from werkzeug.http import is_resource_modified
+
+#----------------------------------------------------------------------------#
+# Conditional GET.
+#----------------------------------------------------------------------------#
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def _csrf_window():
+    # pages embed a CSRF token (the navbar search form) that expires after
+    # WTF_CSRF_TIME_LIMIT; revalidating every half period keeps a reused page's
+    # token valid
+    limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    if not limit:
+        return None
+    return int(time.time()) // max(limit // 2, 1)
+
+
+def conditional(version):
+    """Answer GETs with 304 Not Modified when the page has not changed.
+
+    ``version`` is called with the view arguments and returns the parts that
+    determine the page (update times, counts, ...) and its last modification
+    time, or None when the entity does not exist. The view itself only runs
+    when the client's ETag / If-Modified-Since no longer matches. Responses
+    are private: they embed the visitor's CSRF token, so they cannot be
+    shared between visitors.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            stamp = version(**kwargs)
+            # pending flashed messages are shown on the page, so it must be rendered
+            if stamp is None or session.get('_flashes'):
+                return view(**kwargs)
+            parts, last_modified = stamp
+            # a first visit has no token yet: create it now, not while the view
+            # renders, so the ETag sent matches the next request's
+            generate_csrf()
+            etag = make_etag(request.path, parts, session.get('csrf_token'), _csrf_window())
+            if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = make_response(view(**kwargs))
+            else:
+                response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
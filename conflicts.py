@@ -0,0 +1,206 @@
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import select, and_, or_, func
+
+from models import db, Show, MAX_SHOW_LENGTH
+from interval_index import IntervalIndex
+
+#----------------------------------------------------------------------------#
+# Booking conflicts.
+#----------------------------------------------------------------------------#
+
+# a venue hosts one show at a time and an artist plays one show at a time:
+# shows of the same venue (or artist) must not overlap as [start, end)
+
+Booking = namedtuple('Booking', ['venue_id', 'artist_id', 'start_time', 'end_time'])
+
+# show_id is None when the other booking is part of the same batch
+Conflict = namedtuple('Conflict', ['field', 'show_id', 'start_time', 'end_time'])
+
+SIDES = (
+    ('venue_id', Show.venue_id, 'Venue'),
+    ('artist_id', Show.artist_id, 'Artist'),
+)
+
+
+def describe(conflict):
+    label = dict((field, label) for field, _, label in SIDES)[conflict.field]
+    other = 'show {}'.format(conflict.show_id) if conflict.show_id is not None else 'another show in this batch'
+    return '{} is already booked from {:%Y-%m-%d %H:%M} to {:%Y-%m-%d %H:%M} ({})'.format(
+        label, conflict.start_time, conflict.end_time, other)
+
+
+def _windows(field, bookings):
+    # the time span each venue / artist of the batch is booked over
+    windows = {}
+    for booking in bookings:
+        key = getattr(booking, field)
+        start, end = windows.get(key, (booking.start_time, booking.end_time))
+        windows[key] = (min(start, booking.start_time), max(end, booking.end_time))
+    return windows
+
+
+class ConflictChecker(ABC):
+
+    @abstractmethod
+    def overlapping(self, field, column, bookings, bind):
+        """Yield ``(index, show_id, start, end)`` for stored shows overlapping ``bookings``."""
+
+    def record(self, shows):
+        # called with (id, venue_id, artist_id, start, end) rows after they
+        # are committed; database checkers see them already
+        pass
+
+    def reset(self):
+        pass
+
+
+class SqlConflictChecker(ConflictChecker):
+    """Portable checker: reads the candidate shows with one query per chunk of keys.
+
+    Shows are at most MAX_SHOW_LENGTH long, so one overlapping ``[start, end)``
+    starts within ``(start - MAX_SHOW_LENGTH, end)``; that range is served by
+    the (venue_id, start_time) / (artist_id, start_time) indexes. The exact
+    overlap test runs in Python on the few rows returned.
+    """
+
+    KEYS_PER_QUERY = 200
+
+    def condition(self, column, key, start, end):
+        return and_(column == key, Show.start_time < end, Show.start_time > start - MAX_SHOW_LENGTH,
+                    Show.end_time > start)
+
+    def overlapping(self, field, column, bookings, bind):
+        windows = list(_windows(field, bookings).items())
+        candidates = IntervalIndex()
+        for offset in range(0, len(windows), self.KEYS_PER_QUERY):
+            chunk = windows[offset:offset + self.KEYS_PER_QUERY]
+            query = select(Show.id, column, Show.start_time, Show.end_time).where(
+                or_(*[self.condition(column, key, start, end) for key, (start, end) in chunk]))
+            for show_id, key, start, end in (bind or db.session).execute(query):
+                candidates.add(key, start, end, show_id)
+        for index, booking in enumerate(bookings):
+            for show_id, start, end in candidates.overlapping(
+                    getattr(booking, field), booking.start_time, booking.end_time):
+                yield index, show_id, start, end
+
+
+class PostgresConflictChecker(SqlConflictChecker):
+    """Range overlap (``&&``) on ``tsrange(start_time, end_time)``.
+
+    Migration 5e0c7b2a9d14 adds one exclusion constraint per side, which
+    rejects overlapping inserts even under concurrency, and the GiST index
+    behind each constraint answers these lookups without relying on a
+    maximum show length.
+    """
+
+    def condition(self, column, key, start, end):
+        return and_(column == key, func.tsrange(Show.start_time, Show.end_time).op('&&')(
+            func.tsrange(start, end)))
+
+
+class MemoryConflictChecker(ConflictChecker):
+    """Checks against an in-process IntervalIndex of every show.
+
+    Meant for SQLite and tests, where there is no exclusion constraint: the
+    index is loaded on first use (or by ``warm()``) and kept current through
+    ``record()``, which the handlers call after committing. Each process has
+    its own copy, so it only sees shows created through it.
+    """
+
+    BUILD_BATCH = 10000
+
+    def __init__(self):
+        self._index = None
+
+    def _build(self):
+        index = IntervalIndex()
+        query = db.session.query(Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.end_time)
+        for row in query.yield_per(self.BUILD_BATCH):
+            self._add(index, row)
+        return index
+
+    @staticmethod
+    def _add(index, row):
+        show_id, venue_id, artist_id, start, end = row
+        index.add(('venue_id', venue_id), start, end, show_id)
+        index.add(('artist_id', artist_id), start, end, show_id)
+
+    def index(self):
+        if self._index is None:
+            self._index = self._build()
+        return self._index
+
+    def warm(self):
+        self.index()
+
+    def overlapping(self, field, column, bookings, bind):
+        index = self.index()
+        for position, booking in enumerate(bookings):
+            for show_id, start, end in index.overlapping(
+                    (field, getattr(booking, field)), booking.start_time, booking.end_time):
+                yield position, show_id, start, end
+
+    def record(self, shows):
+        if self._index is None:
+            return
+        if any(row[0] is None for row in shows):
+            # written without returning ids (COPY): reload on next use
+            self.reset()
+            return
+        for row in shows:
+            self._add(self._index, row)
+
+    def reset(self):
+        self._index = None
+
+
+CHECKERS = {
+    'postgresql': PostgresConflictChecker,
+    'sql': SqlConflictChecker,
+    'memory': MemoryConflictChecker,
+}
+
+
+def get_checker():
+    # CONFLICT_BACKEND picks a checker explicitly; PostgreSQL uses its
+    # exclusion constraints, SQLite the in-memory index, anything else SQL
+    checker = current_app.extensions.get('conflicts')
+    if checker is None:
+        name = current_app.config.get('CONFLICT_BACKEND') or {
+            'postgresql': 'postgresql', 'sqlite': 'memory'}.get(db.engine.dialect.name, 'sql')
+        checker = current_app.extensions['conflicts'] = CHECKERS[name]()
+    return checker
+
+
+def find_conflicts(bookings, bind=None):
+    """Return ``{index: [Conflict, ...]}`` for the ``bookings`` that cannot be made.
+
+    A booking conflicts with a stored show or with an earlier booking of the
+    same list at the same venue or with the same artist.
+    """
+    checker = get_checker()
+    conflicts = {}
+    for field, column, _ in SIDES:
+        for index, show_id, start, end in checker.overlapping(field, column, bookings, bind):
+            conflicts.setdefault(index, []).append(Conflict(field, show_id, start, end))
+    # bookings are taken in order, and only the ones taken block later ones
+    taken = IntervalIndex()
+    for index, booking in enumerate(bookings):
+        if index in conflicts:
+            continue
+        keys = [(field, getattr(booking, field)) for field, _, _ in SIDES]
+        for key in keys:
+            for _, start, end in taken.overlapping(key, booking.start_time, booking.end_time):
+                conflicts.setdefault(index, []).append(Conflict(key[0], None, start, end))
+        if index not in conflicts:
+            for key in keys:
+                taken.add(key, booking.start_time, booking.end_time, index)
+    return conflicts
+
+
+def record_shows(shows):
+    """Tell the checker about committed shows, as (id, venue_id, artist_id, start, end) rows."""
+    get_checker().record(shows)
@@ -0,0 +1,25 @@
+from flask_moment import Moment
+from flask_wtf.csrf import CSRFProtect
+
+from cache import FragmentCache
+from profiler import Profiler
+from metrics import Metrics
+
+#----------------------------------------------------------------------------#
+# Extensions.
+#----------------------------------------------------------------------------#
+
+# created without an app so the blueprints can use them when imported;
+# create_app() binds them
+
+moment = Moment()
+csrf = CSRFProtect()
+
+# rendered page fragments, dropped whenever a commit touches the data they show
+fragment_cache = FragmentCache()
+
+# statement counts and db / render / python time per request, slow ones logged
+profiler = Profiler()
+
+# prometheus metrics, fed by the profiler and the fragment cache
+metrics = Metrics()
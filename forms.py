@@ -1,9 +1,84 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask_wtf import FlaskForm
 from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField,BooleanField,TextAreaField,validators
-from wtforms.validators import DataRequired, AnyOf, URL,Length,ValidationError
+from wtforms.validators import DataRequired, AnyOf, URL,Length,ValidationError,Optional
+
+from sqlalchemy import select, literal, union_all
+from werkzeug.datastructures import MultiDict
+
+from models import db,Artist,Venue,DEFAULT_SHOW_LENGTH,MAX_SHOW_LENGTH
+from conflicts import Booking, find_conflicts, describe
+
+
+# largest id that can be bound to a query: the drivers pass integers as
+# 64-bit, a larger one raises OverflowError
+MAX_ID = 2 ** 63 - 1
+
+
+def _is_id(value):
+    value = value.strip()
+    return value.isdecimal() and 0 < int(value) <= MAX_ID
+
+
+def existing_references(artist_ids, venue_ids, bind=None):
+    """Return the subsets of ``artist_ids`` and ``venue_ids`` that exist, in one query."""
+    artist_ids = sorted(set(artist_ids))
+    venue_ids = sorted(set(venue_ids))
+    if not artist_ids and not venue_ids:
+        return set(), set()
+    query = union_all(
+        select(literal('artist'), Artist.id).where(Artist.id.in_(artist_ids)),
+        select(literal('venue'), Venue.id).where(Venue.id.in_(venue_ids)))
+    found = {'artist': set(), 'venue': set()}
+    for kind, entity_id in (bind or db.session).execute(query):
+        found[kind].add(entity_id)
+    return found['artist'], found['venue']
+
+
+def validate_shows(forms, extra_validators=None):
+    """Validate many ``ShowForm`` at once.
+
+    Artists and venues are looked up with a single query, then the shows are
+    checked against existing bookings and each other (see conflicts.py).
+    """
+    checked = [form for form in forms if FlaskForm.validate(form, extra_validators)]
+    artists, venues = existing_references(
+        [int(form.artist_id.data) for form in checked],
+        [int(form.venue_id.data) for form in checked])
+    valid = len(checked) == len(forms)
+    for form in checked:
+        if int(form.artist_id.data) not in artists:
+            form.artist_id.errors.append("Artist does not exists")
+            valid = False
+        if int(form.venue_id.data) not in venues:
+            form.venue_id.errors.append("Venue does not exists")
+            valid = False
+    bookable = [form for form in checked if not form.errors]
+    for index, conflicts in find_conflicts([form.booking() for form in bookable]).items():
+        bookable[index].start_time.errors.extend(describe(conflict) for conflict in conflicts)
+        valid = False
+    return valid
+
+
+def formdata(record):
+    """Turn a decoded CSV/JSON record into form data the fields below accept."""
+    data = MultiDict()
+    for key, value in record.items():
+        if key == 'genres':
+            if isinstance(value, str):
+                value = [genre.strip() for genre in value.split(',') if genre.strip()]
+            for genre in value or []:
+                data.add('genres', genre)
+        elif isinstance(value, bool) or key == 'seeking_talent':
+            # BooleanField only treats 'false' and '' as false
+            if str(value).strip().lower() in ('true', 'y', 'yes', '1'):
+                data.add(key, 'y')
+        elif key in ('start_time', 'end_time') and isinstance(value, str):
+            data.add(key, value.replace('T', ' ').split('.')[0])
+        elif value is not None:
+            data.add(key, str(value))
+    return data
 
-from models import Artist,Venue
 
 class ShowForm(FlaskForm):
     artist_id = StringField(
@@ -17,14 +92,37 @@ class ShowForm(FlaskForm):
         validators=[DataRequired()],
         default= datetime.today()
     )
+    # left empty, the show lasts DEFAULT_SHOW_LENGTH
+    end_time = DateTimeField(
+        'end_time',
+        validators=[Optional()]
+    )
+
+    # existence is checked by validate_shows, one query for both ids
 
     def validate_artist_id(form,field):
-        if(Artist.query.get(int(field.data)) is None):
-            raise ValidationError("Artist does not exists")
-    
+        if not _is_id(field.data):
+            raise ValidationError("Artist ID must be a number")
+
     def validate_venue_id(form,field):
-        if(Venue.query.get(int(field.data)) is None):
-            raise ValidationError("Venue does not exists")
+        if not _is_id(field.data):
+            raise ValidationError("Venue ID must be a number")
+
+    def validate_end_time(form,field):
+        if form.start_time.data is None:
+            return
+        if field.data <= form.start_time.data:
+            raise ValidationError("End time must be after the start time")
+        if field.data - form.start_time.data > MAX_SHOW_LENGTH:
+            raise ValidationError("A show cannot last longer than {} hours".format(MAX_SHOW_LENGTH // timedelta(hours=1)))
+
+    def booking(self):
+        start_time = self.start_time.data
+        return Booking(int(self.venue_id.data), int(self.artist_id.data), start_time,
+                       self.end_time.data or start_time + DEFAULT_SHOW_LENGTH)
+
+    def validate(self, extra_validators=None):
+        return validate_shows([self], extra_validators)
 
 
 class VenueForm(FlaskForm):
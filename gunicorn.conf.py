@@ -0,0 +1,35 @@
+import multiprocessing
+import os
+
+#----------------------------------------------------------------------------#
+# gunicorn settings for wsgi:application.
+#----------------------------------------------------------------------------#
+
+# one worker process per core by default, each running THREADS requests at
+# once; every worker has its own connection pool, so keep THREADS within
+# DB_POOL_SIZE + DB_MAX_OVERFLOW and WEB_CONCURRENCY * that within the
+# database's connection limit
+bind = '0.0.0.0:' + os.environ.get('PORT', '8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# import and warm the app once in the master, before forking
+preload_app = True
+
+timeout = int(os.environ.get('WORKER_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# recycling workers bounds slow memory growth; jitter keeps them from
+# restarting all at once
+max_requests = int(os.environ.get('MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    import wsgi
+    wsgi.after_fork(wsgi.application)
@@ -0,0 +1,70 @@
+from datetime import datetime
+
+from flask import current_app, request, abort
+from sqlalchemy import func, case
+
+from models import db, Show, Genre
+from pagination import keyset_paginate, clamp_limit, InvalidCursor
+
+#----------------------------------------------------------------------------#
+# Helpers shared by the venue, artist and show views.
+#----------------------------------------------------------------------------#
+
+def paginate(query, keys):
+  # pages through query using the ?after= / ?before= / ?limit= request arguments
+  limit = clamp_limit(request.args.get('limit'), current_app.config['PAGE_SIZE'], current_app.config['MAX_PAGE_SIZE'])
+  try:
+    return keyset_paginate(query, keys,
+                           after=request.args.get('after'),
+                           before=request.args.get('before'),
+                           limit=limit)
+  except InvalidCursor:
+    abort(400)
+
+def filter_by_upcoming(query, model):
+  # ?upcoming=1 keeps the venues/artists with upcoming shows, read from their counters
+  if request.args.get('upcoming'):
+    query = query.filter(model.upcoming_shows_count > 0)
+  return query
+
+def filter_by_genre(query, relationship):
+  # ?genre=Jazz restricts a listing through the genre association tables,
+  # an equality match on the unique genre name instead of LIKE '%Jazz%'
+  genre = request.args.get('genre')
+  if genre:
+    query = query.join(relationship).filter(Genre.name == genre)
+  return query
+
+def page_version(entity, updated_at, show_owner_id, other, other_id, entity_id):
+  # cheap stamp of a detail page: everything it renders is covered by the
+  # entity's and the linked rows' update times plus the show counts
+  # (deleted shows and shows moving from upcoming to past)
+  now = datetime.now()
+  row = db.session.query(
+      updated_at,
+      func.max(Show.updated_at),
+      func.max(other.updated_at),
+      func.count(Show.id),
+      func.count(case((Show.start_time > now, 1)))
+    ).select_from(entity
+    ).outerjoin(Show, show_owner_id == entity.id
+    ).outerjoin(other, other.id == other_id
+    ).filter(entity.id == entity_id
+    ).group_by(entity.id, updated_at).first()
+  if row is None:
+    return None
+  last_modified = max(value for value in row[:3] if value is not None)
+  return tuple(row), last_modified
+
+def split_shows(shows):
+  # partitions shows into (past, upcoming) against a single "now" so that
+  # every show lands in exactly one of the two lists
+  now = datetime.now()
+  past_shows = []
+  upcoming_shows = []
+  for show in shows:
+    if show['start_time'] > now:
+      upcoming_shows.append(show)
+    else:
+      past_shows.append(show)
+  return past_shows, upcoming_shows
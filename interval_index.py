@@ -0,0 +1,100 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+#----------------------------------------------------------------------------#
+# In-memory interval index.
+#----------------------------------------------------------------------------#
+
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
+
+
+def seconds(value):
+    # naive datetimes as whole seconds, the resolution of the show forms
+    return (value - EPOCH) // SECOND
+
+
+class _Timeline(object):
+    # the intervals of one key, sorted by start, in parallel arrays
+
+    __slots__ = ('starts', 'ends', 'ids', 'longest')
+
+    def __init__(self):
+        self.starts = array('q')
+        self.ends = array('q')
+        self.ids = array('q')
+        self.longest = 0
+
+    def add(self, start, end, item_id):
+        if not self.starts or self.starts[-1] <= start:
+            # intervals are mostly loaded in start order
+            position = len(self.starts)
+        else:
+            position = bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.ids.insert(position, item_id)
+        self.longest = max(self.longest, end - start)
+
+    def remove(self, start, item_id):
+        position = bisect_left(self.starts, start)
+        while position < len(self.starts) and self.starts[position] == start:
+            if self.ids[position] == item_id:
+                del self.starts[position]
+                del self.ends[position]
+                del self.ids[position]
+                return True
+            position += 1
+        return False
+
+    def overlapping(self, start, end):
+        # an interval overlapping [start, end) starts before ``end`` and no
+        # earlier than ``start - longest``, so only that slice is scanned
+        position = bisect_left(self.starts, start - self.longest)
+        stop = bisect_left(self.starts, end)
+        for i in range(position, stop):
+            if self.ends[i] > start:
+                yield self.ids[i], self.starts[i], self.ends[i]
+
+
+class IntervalIndex(object):
+    """Half-open ``[start, end)`` datetime intervals grouped by key.
+
+    Every key (a venue, an artist) keeps its intervals sorted by start in
+    three ``array('q')`` columns, 24 bytes per interval. An overlap query
+    bisects to the first interval that could still reach the queried start,
+    which is bounded by the longest interval stored for the key, and scans
+    forward until the queried end, so a lookup costs O(log n) plus the
+    intervals actually in the window; with bounded show lengths that is a
+    handful of entries.
+    """
+
+    def __init__(self):
+        self._timelines = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return sum(len(timeline.ids) for timeline in self._timelines.values())
+
+    def add(self, key, start, end, item_id):
+        with self._lock:
+            timeline = self._timelines.get(key)
+            if timeline is None:
+                timeline = self._timelines[key] = _Timeline()
+            timeline.add(seconds(start), seconds(end), item_id)
+
+    def remove(self, key, start, item_id):
+        with self._lock:
+            timeline = self._timelines.get(key)
+            return timeline is not None and timeline.remove(seconds(start), item_id)
+
+    def overlapping(self, key, start, end):
+        """Return the ``(id, start, end)`` intervals of ``key`` overlapping ``[start, end)``."""
+        with self._lock:
+            timeline = self._timelines.get(key)
+            if timeline is None:
+                return []
+            return [(item_id, EPOCH + SECOND * first, EPOCH + SECOND * last)
+                    for item_id, first, last in timeline.overlapping(seconds(start), seconds(end))]
@@ -0,0 +1,276 @@
+import threading
+import weakref
+from bisect import bisect_left
+from collections import deque
+
+from flask import current_app, request
+
+#----------------------------------------------------------------------------#
+# Prometheus metrics.
+#----------------------------------------------------------------------------#
+
+# upper bounds, in seconds, of the latency histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(name, _escape(value)) for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Shard(object):
+    # holds a thread's dict in its thread-local; collected when the thread ends
+    __slots__ = ('values', '__weakref__')
+
+    def __init__(self):
+        self.values = {}
+
+
+class _Sharded(object):
+    # every thread updates its own dict, so recording takes no lock (only a
+    # thread's first update registers its dict); a scrape copies the dicts of
+    # all threads, an atomic operation under the GIL, and adds them up. when
+    # a thread ends its dict is folded into `_base`, so thread-per-request
+    # servers do not pile up one dict per request served
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._base = {}
+        self._shards = []
+        # dicts of finished threads, folded in on the next scrape or new shard;
+        # the finalizer only appends, so it never waits on the lock
+        self._retired = deque()
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        try:
+            return self._local.shard.values
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            weakref.finalize(shard, self._retired.append, shard.values)
+            with self._lock:
+                self._fold()
+                self._shards.append(shard.values)
+            return shard.values
+
+    def _fold(self):
+        # with the lock held
+        while self._retired:
+            values = self._retired.popleft()
+            for index, shard in enumerate(self._shards):
+                if shard is values:
+                    del self._shards[index]
+                    break
+            for labels, value in list(values.items()):
+                self._merge(self._base, labels, value)
+
+    def _copies(self):
+        with self._lock:
+            self._fold()
+            return [dict(self._base)] + [shard.copy() for shard in self._shards]
+
+class Counter(_Sharded):
+
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        values = self._shard()
+        values[labels] = values.get(labels, 0) + amount
+
+    @staticmethod
+    def _merge(into, labels, value):
+        into[labels] = into.get(labels, 0) + value
+
+    def totals(self):
+        totals = {}
+        for shard in self._copies():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def value(self, labels=()):
+        return self.totals().get(labels, 0)
+
+    def samples(self):
+        for labels, value in sorted(self.totals().items()):
+            yield '{}{} {}'.format(self.name, _labels(self.labelnames, labels), _number(value))
+
+
+class Histogram(_Sharded):
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        values = self._shard()
+        counts = values.get(labels)
+        if counts is None:
+            # one slot per bucket, then +Inf, then the sum
+            counts = values[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @staticmethod
+    def _merge(into, labels, counts):
+        total = into.get(labels)
+        into[labels] = list(counts) if total is None else [a + b for a, b in zip(total, counts)]
+
+    def totals(self):
+        totals = {}
+        for shard in self._copies():
+            for labels, counts in shard.items():
+                counts = list(counts)
+                total = totals.get(labels)
+                totals[labels] = counts if total is None else [a + b for a, b in zip(total, counts)]
+        return totals
+
+    def samples(self):
+        for labels, counts in sorted(self.totals().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(bound)
+                yield '{}_bucket{} {}'.format(self.name, _labels(self.labelnames, labels, [('le', le)]), cumulative)
+            yield '{}_sum{} {}'.format(self.name, _labels(self.labelnames, labels), _number(counts[-1]))
+            yield '{}_count{} {}'.format(self.name, _labels(self.labelnames, labels), cumulative)
+
+
+class Gauge(object):
+    """Values computed at scrape time by ``collect()``, as (labels, value) pairs.
+
+    ``kind='counter'`` exposes a running total kept elsewhere (pool.py).
+    """
+
+    def __init__(self, name, documentation, labelnames, collect, kind='gauge'):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def samples(self):
+        for labels, value in self.collect():
+            if value is None:
+                continue
+            yield '{}{} {}'.format(self.name, _labels(self.labelnames, labels), _number(value))
+
+
+class Registry(object):
+
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.add(Counter(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.add(Histogram(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.add(Gauge(*args, **kwargs))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append('# HELP {} {}'.format(metric.name, metric.documentation))
+            lines.append('# TYPE {} {}'.format(metric.name, metric.kind))
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+class AppMetrics(object):
+    """The metric families of one app and the profiler callback feeding them."""
+
+    def __init__(self):
+        self.registry = Registry()
+        registry = self.registry
+        self.requests = registry.histogram(
+            'fyyur_http_request_duration_seconds', 'Time spent handling requests, by route.',
+            ('endpoint', 'method'))
+        self.responses = registry.counter(
+            'fyyur_http_responses_total', 'Responses sent, by route and status code.',
+            ('endpoint', 'method', 'status'))
+        self.queries = registry.counter(
+            'fyyur_db_queries_total', 'SQL statements executed, by route.', ('endpoint',))
+        self.query_seconds = registry.counter(
+            'fyyur_db_query_seconds_total', 'Time spent in SQL statements, by route.', ('endpoint',))
+        self.renders = registry.histogram(
+            'fyyur_template_render_duration_seconds', 'Time spent rendering Jinja templates.', ('template',))
+
+    def record(self, profile, response):
+        endpoint = request.endpoint or 'unmatched'
+        self.requests.observe(profile.total, (endpoint, request.method))
+        self.responses.inc((endpoint, request.method, str(response.status_code)))
+        if profile.statements:
+            self.queries.inc((endpoint,), profile.statements)
+            self.query_seconds.inc((endpoint,), profile.db_time)
+        for template, seconds in profile.templates:
+            self.renders.observe(seconds, (template,))
+
+    def render(self):
+        return self.registry.render()
+
+
+class Metrics(object):
+    """Request, database, template and cache metrics for ``/metrics``.
+
+    Request timings come from the profiler (profiler.py), which already
+    measures every request, so collecting metrics adds a few dict updates
+    per request and nothing per SQL statement. Every app gets its own
+    families (AppMetrics), so creating a second app neither doubles the
+    counts nor repeats a family in the exposition.
+    """
+
+    def __init__(self, app=None, **sources):
+        if app is not None:
+            self.init_app(app, **sources)
+
+    def init_app(self, app, profiler, fragment_cache=None, pool_status=None, engines=None):
+        metrics = AppMetrics()
+        registry = metrics.registry
+        if fragment_cache is not None:
+            registry.add(fragment_cache.hits)
+            registry.add(fragment_cache.misses)
+            registry.gauge('fyyur_fragment_cache_hit_ratio', 'Share of fragment cache lookups that hit.', (),
+                           lambda: [((), fragment_cache.stats()['hit_ratio'])])
+        if pool_status is not None:
+            def pool(field, scale=1):
+                def collect():
+                    for key, engine in engines().items():
+                        value = pool_status(engine).get(field)
+                        yield (key or 'default',), value * scale if value is not None else None
+                return collect
+            registry.gauge('fyyur_db_pool_connections_in_use', 'Connections checked out of the pool.',
+                           ('database',), pool('in_use'))
+            registry.gauge('fyyur_db_pool_checkouts_total', 'Connections handed out by the pool.',
+                           ('database',), pool('checkouts'), kind='counter')
+            registry.gauge('fyyur_db_pool_checkout_wait_seconds_max', 'Longest wait for a pool connection.',
+                           ('database',), pool('wait_max_ms', 0.001))
+        app.extensions['metrics'] = metrics
+        profiler.add_callback(app, metrics.record)
+        return metrics
+
+    def render(self):
+        return current_app.extensions['metrics'].render()
@@ -0,0 +1,47 @@
+"""indexes for hot query paths
+
+Revision ID: 3f9c2a7d81b4
+Revises: e48ad2d3d112
+Create Date: 2026-10-18 10:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d81b4'
+down_revision = 'e48ad2d3d112'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite cannot alter a column in place: batch mode copies the table
+    with op.batch_alter_table('shows') as batch_op:
+        batch_op.alter_column('start_time', existing_type=sa.DateTime(), nullable=False)
+        batch_op.alter_column('venue_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('artist_id', existing_type=sa.Integer(), nullable=False)
+    with op.batch_alter_table('venues') as batch_op:
+        batch_op.alter_column('city', existing_type=sa.String(length=120), nullable=False)
+        batch_op.alter_column('state', existing_type=sa.String(length=120), nullable=False)
+
+    op.create_index('ix_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_shows_artist_id_start_time', 'shows', ['artist_id', 'start_time'], unique=False)
+    op.create_index('ix_shows_start_time_id', 'shows', ['start_time', 'id'], unique=False)
+    op.create_index('ix_venues_state_city_id', 'venues', ['state', 'city', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_venues_state_city_id', table_name='venues')
+    op.drop_index('ix_shows_start_time_id', table_name='shows')
+    op.drop_index('ix_shows_artist_id_start_time', table_name='shows')
+    op.drop_index('ix_shows_venue_id_start_time', table_name='shows')
+
+    with op.batch_alter_table('venues') as batch_op:
+        batch_op.alter_column('state', existing_type=sa.String(length=120), nullable=True)
+        batch_op.alter_column('city', existing_type=sa.String(length=120), nullable=True)
+    with op.batch_alter_table('shows') as batch_op:
+        batch_op.alter_column('artist_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.alter_column('venue_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.alter_column('start_time', existing_type=sa.DateTime(), nullable=True)
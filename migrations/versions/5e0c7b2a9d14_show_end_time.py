@@ -0,0 +1,51 @@
+"""show end time and booking exclusion constraints
+
+Revision ID: 5e0c7b2a9d14
+Revises: c2a5f8e6b910
+Create Date: 2026-10-18 18:02:44.130517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e0c7b2a9d14'
+down_revision = 'c2a5f8e6b910'
+branch_labels = None
+depends_on = None
+
+# existing shows get the default length, models.DEFAULT_SHOW_LENGTH
+DEFAULT_LENGTH_HOURS = 2
+
+
+def upgrade():
+    bind = op.get_bind()
+    op.add_column('shows', sa.Column('end_time', sa.DateTime(), nullable=True))
+    if bind.dialect.name == 'postgresql':
+        op.execute("UPDATE shows SET end_time = start_time + interval '{} hours'".format(DEFAULT_LENGTH_HOURS))
+    else:
+        # same text format as SQLAlchemy writes, so that values compare correctly
+        op.execute("UPDATE shows SET end_time = strftime('%Y-%m-%d %H:%M:%f000', start_time, '+{} hours')".format(
+            DEFAULT_LENGTH_HOURS))
+    with op.batch_alter_table('shows') as batch_op:
+        batch_op.alter_column('end_time', existing_type=sa.DateTime(), nullable=False)
+
+    if bind.dialect.name != 'postgresql':
+        return
+    # one venue / one artist cannot be in two shows at once. creating the
+    # constraints fails if existing shows already overlap; those have to be
+    # rescheduled first
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for column in ('venue_id', 'artist_id'):
+        op.execute(
+            'ALTER TABLE shows ADD CONSTRAINT shows_{column}_no_overlap '
+            'EXCLUDE USING gist ({column} WITH =, tsrange(start_time, end_time) WITH &&)'.format(column=column))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for column in ('artist_id', 'venue_id'):
+            op.execute('ALTER TABLE shows DROP CONSTRAINT IF EXISTS shows_{}_no_overlap'.format(column))
+    with op.batch_alter_table('shows') as batch_op:
+        batch_op.drop_column('end_time')
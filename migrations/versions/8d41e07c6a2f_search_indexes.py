@@ -0,0 +1,42 @@
+"""search indexes
+
+Revision ID: 8d41e07c6a2f
+Revises: 3f9c2a7d81b4
+Create Date: 2026-10-18 11:40:07.915244
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d41e07c6a2f'
+down_revision = '3f9c2a7d81b4'
+branch_labels = None
+depends_on = None
+
+# must stay identical to PostgresSearchBackend.document() in search.py
+DOCUMENT = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(city, '') || ' ' || coalesce(genres, ''))"
+
+
+def upgrade():
+    # pg_trgm and GIN indexes only exist on PostgreSQL, other databases use
+    # the in-process search backends
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in ('venues', 'artists'):
+        for column in ('name', 'city', 'genres'):
+            op.execute('CREATE INDEX ix_{table}_{column}_trgm ON {table} USING gin ({column} gin_trgm_ops)'.format(
+                table=table, column=column))
+        op.execute('CREATE INDEX ix_{table}_search_document ON {table} USING gin (({document}))'.format(
+            table=table, document=DOCUMENT))
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table in ('venues', 'artists'):
+        op.execute('DROP INDEX IF EXISTS ix_{}_search_document'.format(table))
+        for column in ('name', 'city', 'genres'):
+            op.execute('DROP INDEX IF EXISTS ix_{}_{}_trgm'.format(table, column))
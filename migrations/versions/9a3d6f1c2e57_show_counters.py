@@ -0,0 +1,44 @@
+"""upcoming/past show counters on venues and artists
+
+Revision ID: 9a3d6f1c2e57
+Revises: 5e0c7b2a9d14
+Create Date: 2026-10-18 19:41:07.204118
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a3d6f1c2e57'
+down_revision = '5e0c7b2a9d14'
+branch_labels = None
+depends_on = None
+
+# same counts as show_counts.recount(), against the application's local "now"
+BACKFILL = '''
+    UPDATE {table} SET
+      upcoming_shows_count = (SELECT count(*) FROM shows WHERE shows.{owner} = {table}.id AND shows.start_time > :now),
+      past_shows_count = (SELECT count(*) FROM shows WHERE shows.{owner} = {table}.id AND shows.start_time <= :now),
+      next_show_at = (SELECT min(start_time) FROM shows WHERE shows.{owner} = {table}.id AND shows.start_time > :now)'''
+
+
+def upgrade():
+    for table, owner in (('venues', 'venue_id'), ('artists', 'artist_id')):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('next_show_at', sa.DateTime(), nullable=True))
+        op.create_index('ix_{}_next_show_at'.format(table), table, ['next_show_at'])
+        op.get_bind().execute(sa.text(BACKFILL.format(table=table, owner=owner)).bindparams(
+            sa.bindparam('now', datetime.now(), type_=sa.DateTime())))
+
+
+def downgrade():
+    for table in ('artists', 'venues'):
+        op.drop_index('ix_{}_next_show_at'.format(table), table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('next_show_at')
+            batch_op.drop_column('past_shows_count')
+            batch_op.drop_column('upcoming_shows_count')
@@ -0,0 +1,107 @@
+"""normalise genres
+
+Revision ID: b7e19c40d5a3
+Revises: 8d41e07c6a2f
+Create Date: 2026-10-18 13:05:52.280913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e19c40d5a3'
+down_revision = '8d41e07c6a2f'
+branch_labels = None
+depends_on = None
+
+OWNERS = (('venues', 'venue_genres', 'venue_id'), ('artists', 'artist_genres', 'artist_id'))
+
+# search document of migration 8d41e07c6a2f, without the genres column
+DOCUMENT = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(city, ''))"
+OLD_DOCUMENT = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(city, '') || ' ' || coalesce(genres, ''))"
+
+
+def upgrade():
+    bind = op.get_bind()
+    genres = op.create_table('genres',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    links = {}
+    for table, link, owner in OWNERS:
+        links[table] = op.create_table(link,
+        sa.Column(owner, sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint([owner], [table + '.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['genre_id'], ['genres.id'], ),
+        sa.PrimaryKeyConstraint(owner, 'genre_id')
+        )
+        op.create_index('ix_{}_genre_id_{}'.format(link, owner), link, ['genre_id', owner], unique=False)
+
+    # split the comma-joined strings into genre rows and links
+    owned = {}
+    for table, link, owner in OWNERS:
+        rows = bind.execute(sa.text('SELECT id, genres FROM {} WHERE genres IS NOT NULL'.format(table)))
+        owned[table] = [(row.id, [name.strip() for name in row.genres.split(',') if name.strip()])
+                        for row in rows]
+    names = sorted(set(name for rows in owned.values() for _, row_genres in rows for name in row_genres))
+    if names:
+        op.bulk_insert(genres, [{'id': i, 'name': name} for i, name in enumerate(names, 1)])
+        if bind.dialect.name == 'postgresql':
+            op.execute("SELECT setval('genres_id_seq', {})".format(len(names)))
+    ids = dict((name, i) for i, name in enumerate(names, 1))
+    for table, link, owner in OWNERS:
+        rows = [{owner: owner_id, 'genre_id': ids[name]}
+                for owner_id, row_genres in owned[table] for name in set(row_genres)]
+        if rows:
+            op.bulk_insert(links[table], rows)
+
+    if bind.dialect.name == 'postgresql':
+        for table, _, _ in OWNERS:
+            op.execute('DROP INDEX IF EXISTS ix_{}_genres_trgm'.format(table))
+            op.execute('DROP INDEX IF EXISTS ix_{}_search_document'.format(table))
+            op.execute('CREATE INDEX ix_{table}_search_document ON {table} USING gin (({document}))'.format(
+                table=table, document=DOCUMENT))
+    elif bind.dialect.name == 'sqlite':
+        # the FTS index and its triggers are rebuilt on first search without genres
+        for table, _, _ in OWNERS:
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute('DROP TRIGGER IF EXISTS {}_fts_{}'.format(table, suffix))
+            op.execute('DROP TABLE IF EXISTS {}_fts'.format(table))
+
+    for table, _, _ in OWNERS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('genres')
+
+
+def downgrade():
+    bind = op.get_bind()
+    op.add_column('venues', sa.Column('genres', sa.String(), nullable=True))
+    op.add_column('artists', sa.Column('genres', sa.String(length=120), nullable=True))
+
+    for table, link, owner in OWNERS:
+        rows = bind.execute(sa.text(
+            'SELECT {link}.{owner} AS owner_id, genres.name FROM {link} '
+            'JOIN genres ON genres.id = {link}.genre_id ORDER BY genres.name'.format(link=link, owner=owner)))
+        joined = {}
+        for row in rows:
+            joined.setdefault(row.owner_id, []).append(row.name)
+        for owner_id, names in joined.items():
+            bind.execute(sa.text('UPDATE {} SET genres = :genres WHERE id = :id'.format(table)),
+                         {'genres': ','.join(names), 'id': owner_id})
+
+    for table, link, owner in OWNERS:
+        op.drop_index('ix_{}_genre_id_{}'.format(link, owner), table_name=link)
+        op.drop_table(link)
+    op.drop_table('genres')
+
+    if bind.dialect.name == 'postgresql':
+        for table, _, _ in OWNERS:
+            op.execute('DROP INDEX IF EXISTS ix_{}_search_document'.format(table))
+            op.execute('CREATE INDEX ix_{table}_search_document ON {table} USING gin (({document}))'.format(
+                table=table, document=OLD_DOCUMENT))
+            op.execute('CREATE INDEX ix_{table}_genres_trgm ON {table} USING gin (genres gin_trgm_ops)'.format(
+                table=table))
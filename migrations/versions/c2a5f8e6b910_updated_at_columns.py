@@ -0,0 +1,37 @@
+"""updated_at columns
+
+Revision ID: c2a5f8e6b910
+Revises: b7e19c40d5a3
+Create Date: 2026-10-18 14:21:16.504873
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2a5f8e6b910'
+down_revision = 'b7e19c40d5a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing rows get the migration time, in UTC like models.py writes it;
+    # the database's current_timestamp is local time on Postgres, and SQLite
+    # cannot add a NOT NULL column with a non-constant default
+    now = datetime.utcnow()
+    for table in ('venues', 'artists', 'shows'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.get_bind().execute(sa.text('UPDATE {} SET updated_at = :now'.format(table)).bindparams(
+            sa.bindparam('now', now, type_=sa.DateTime())))
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    for table in ('shows', 'artists', 'venues'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
@@ -1,25 +1,85 @@
 
+from datetime import datetime, timedelta
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import column_property
 
+from routing import RoutingSession
 
-db = SQLAlchemy()
+
+# reads of GET requests may go to a replica, see routing.py
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+# genres are stored once in `genres` and linked through association tables;
+# the (genre_id, owner_id) indexes serve the ?genre= listing filters
+venue_genres = db.Table('venue_genres',
+    db.Column('venue_id', db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genres.id'), primary_key=True),
+    db.Index('ix_venue_genres_genre_id_venue_id', 'genre_id', 'venue_id')
+)
+
+artist_genres = db.Table('artist_genres',
+    db.Column('artist_id', db.Integer, db.ForeignKey('artists.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genres.id'), primary_key=True),
+    db.Index('ix_artist_genres_genre_id_artist_id', 'genre_id', 'artist_id')
+)
+
+
+class Genre(db.Model):
+    __tablename__ = 'genres'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), unique=True, nullable=False)
+
+    @classmethod
+    def from_names(cls, names):
+        # existing genres are loaded in one query, unknown names become new rows
+        names = [name for name in dict.fromkeys(names or []) if name]
+        if not names:
+            return []
+        existing = dict((genre.name, genre) for genre in cls.query.filter(cls.name.in_(names)))
+        return [existing.get(name) or cls(name=name) for name in names]
+
+    def __repr__(self):
+        return f'<Genre {self.name}>'
 
 
 class Venue(db.Model):
     __tablename__ = 'venues'
+    __table_args__ = (
+        # directory page groups and pages venues by state, city
+        db.Index('ix_venues_state_city_id', 'state', 'city', 'id'),
+        # the counters roll-forward job looks up the rows whose next show started
+        db.Index('ix_venues_next_show_at', 'next_show_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
-    city = db.Column(db.String(120))
-    state = db.Column(db.String(120))
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(120))
     phone = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     website_link = db.Column(db.String(250),nullable=True)
     facebook_link = db.Column(db.String(120))
-    genres = db.Column(db.String(),nullable=True)
+    genre_list = db.relationship("Genre",secondary=venue_genres,order_by=Genre.name)
     shows = db.relationship("Show",backref='venue',cascade = "all,delete")
     seeking_talent = db.Column(db.Boolean(),nullable=True)
     seeking_description = db.Column(db.String(500),nullable = True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # maintained by show_counts.py
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    next_show_at = db.Column(db.DateTime, nullable=True)
+
+    # genre names in and out, so forms and templates keep working with strings
+    @property
+    def genres(self):
+        return [genre.name for genre in self.genre_list]
+
+    @genres.setter
+    def genres(self, names):
+        self.genre_list = Genre.from_names(names)
+        # a change to the genre links alone does not update the row
+        self.updated_at = datetime.utcnow()
 
     def __repr__(self):
         return f'<Venue {self.seeking_talent} {self.seeking_description} >'
@@ -27,25 +87,65 @@ class Venue(db.Model):
 
 class Artist(db.Model):
     __tablename__ = 'artists'
+    __table_args__ = (
+        db.Index('ix_artists_next_show_at', 'next_show_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120))
+    genre_list = db.relationship("Genre",secondary=artist_genres,order_by=Genre.name)
     website_link = db.Column(db.String(120),nullable=True)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     shows = db.relationship("Show",backref='artist',cascade="all,delete")
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # maintained by show_counts.py
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    next_show_at = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def genres(self):
+        return [genre.name for genre in self.genre_list]
+
+    @genres.setter
+    def genres(self, names):
+        self.genre_list = Genre.from_names(names)
+        # a change to the genre links alone does not update the row
+        self.updated_at = datetime.utcnow()
+
+
+# shows without an explicit end last DEFAULT_SHOW_LENGTH; none may last
+# longer than MAX_SHOW_LENGTH, which bounds the booking conflict lookups
+DEFAULT_SHOW_LENGTH = timedelta(hours=2)
+MAX_SHOW_LENGTH = timedelta(hours=24)
+
 
+def _default_end_time(context):
+  return context.get_current_parameters()['start_time'] + DEFAULT_SHOW_LENGTH
 
 
 class Show(db.Model):
   __tablename__ = "shows"
+  __table_args__ = (
+    # detail pages fetch a venue's / artist's shows ordered by start time
+    db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time'),
+    db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time'),
+    # the /shows listing is paged on (start_time, id)
+    db.Index('ix_shows_start_time_id', 'start_time', 'id'),
+  )
   id = db.Column(db.Integer,primary_key = True)
-  start_time = db.Column(db.DateTime)
-  venue_id = db.Column(db.Integer,db.ForeignKey('venues.id'))
-  artist_id = db.Column(db.Integer,db.ForeignKey('artists.id'))
+  # active_history: the previous start time, venue and artist are loaded when
+  # they change, even once expired, so show_counts.py can recount the old ones
+  start_time = column_property(db.Column(db.DateTime, nullable=False), active_history=True)
+  # on PostgreSQL, exclusion constraints over tsrange(start_time, end_time)
+  # keep the shows of a venue or of an artist from overlapping (see conflicts.py)
+  end_time = db.Column(db.DateTime, nullable=False, default=_default_end_time)
+  venue_id = column_property(db.Column(db.Integer,db.ForeignKey('venues.id'), nullable=False), active_history=True)
+  artist_id = column_property(db.Column(db.Integer,db.ForeignKey('artists.id'), nullable=False), active_history=True)
+  updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 # class Album(db.Model):
 #     id = db.Column(db.Integer,primary_key=True)
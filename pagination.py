@@ -0,0 +1,124 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+#----------------------------------------------------------------------------#
+# Keyset pagination.
+#----------------------------------------------------------------------------#
+
+# pages are addressed by the sort key of their first/last row instead of an
+# OFFSET, so fetching page N costs the same as fetching page 1
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    # datetimes are tagged so that they survive the round trip through json
+    payload = [['dt', value.isoformat()] if isinstance(value, datetime) else ['v', value]
+               for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, keys=None):
+    # with ``keys``, the values must be one per key column, of its type
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw.decode('utf-8'))
+        values = [datetime.fromisoformat(value) if tag == 'dt' else value
+                  for tag, value in payload]
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if keys is not None:
+        if len(values) != len(keys):
+            raise InvalidCursor(cursor)
+        for key, value in zip(keys, values):
+            if not _of_type(key, value):
+                raise InvalidCursor(cursor)
+    return values
+
+
+def _of_type(column, value):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value is not None
+    if python_type is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    if python_type is float:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    return isinstance(value, python_type)
+
+
+class Page(object):
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, limit=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.limit = limit
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def clamp_limit(limit, default, maximum):
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, maximum))
+
+
+def _row_key(row, keys):
+    return [getattr(row, key.key) for key in keys]
+
+
+def keyset_paginate(query, keys, after=None, before=None, limit=50):
+    """Return one Page of ``query`` ordered by the ``keys`` columns.
+
+    ``keys`` must be unique together (end them with a primary key) and be
+    selected by the query under their own names. ``after``/``before`` are
+    cursors taken from a previous page's ``next_cursor``/``prev_cursor``.
+    """
+    key = tuple_(*keys) if len(keys) > 1 else keys[0]
+
+    if before is not None:
+        values = decode_cursor(before, keys)
+        bound = tuple_(*values) if len(keys) > 1 else values[0]
+        rows = query.filter(key < bound).order_by(*[k.desc() for k in keys]).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = list(reversed(rows[:limit]))
+        next_cursor = encode_cursor(_row_key(rows[-1], keys)) if rows else before
+        prev_cursor = encode_cursor(_row_key(rows[0], keys)) if (rows and has_more) else None
+        return Page(rows, next_cursor, prev_cursor, limit)
+
+    if after is not None:
+        values = decode_cursor(after, keys)
+        bound = tuple_(*values) if len(keys) > 1 else values[0]
+        query = query.filter(key > bound)
+
+    rows = query.order_by(*keys).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(_row_key(rows[-1], keys)) if (rows and has_more) else None
+    if after is None:
+        prev_cursor = None
+    else:
+        prev_cursor = encode_cursor(_row_key(rows[0], keys)) if rows else after
+    return Page(rows, next_cursor, prev_cursor, limit)
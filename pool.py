@@ -0,0 +1,159 @@
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, NullPool
+
+#----------------------------------------------------------------------------#
+# Connection pool configuration and statistics.
+#----------------------------------------------------------------------------#
+
+# upper bounds, in milliseconds, of the checkout wait histogram
+WAIT_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolStats(object):
+    """Checkout counters of one pool, shared by the pools it is recreated into."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.in_use_max = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, timed_out=False):
+        milliseconds = seconds * 1000
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.in_use += 1
+            self.in_use_max = max(self.in_use_max, self.in_use)
+            self.wait_total += milliseconds
+            self.wait_max = max(self.wait_max, milliseconds)
+            self.buckets[bisect_left(WAIT_BUCKETS, milliseconds)] += 1
+
+    def returned(self):
+        with self._lock:
+            self.in_use -= 1
+
+    def snapshot(self):
+        with self._lock:
+            histogram = dict(('le_{}ms'.format(bound), count) for bound, count in zip(WAIT_BUCKETS, self.buckets))
+            histogram['over_{}ms'.format(WAIT_BUCKETS[-1])] = self.buckets[-1]
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'in_use': self.in_use,
+                'in_use_max': self.in_use_max,
+                'wait_avg_ms': self.wait_total / self.checkouts if self.checkouts else None,
+                'wait_max_ms': self.wait_max,
+                'wait_histogram': histogram,
+            }
+
+
+class _TimedPool(object):
+    # times _do_get(): the wait for a free connection, plus opening one when
+    # the pool grows
+
+    @property
+    def stats(self):
+        stats = self.__dict__.get('_stats')
+        if stats is None:
+            stats = self._stats = PoolStats()
+        return stats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super(_TimedPool, self)._do_get()
+        except exc.TimeoutError:
+            self.stats.observe(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.observe(time.perf_counter() - started)
+        return record
+
+    def _do_return_conn(self, record):
+        self.stats.returned()
+        super(_TimedPool, self)._do_return_conn(record)
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep counting into the same stats
+        pool = super(_TimedPool, self).recreate()
+        pool._stats = self.stats
+        return pool
+
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    pass
+
+
+class TimedNullPool(_TimedPool, NullPool):
+    pass
+
+
+def _flag(value):
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def engine_options(config):
+    """Build SQLALCHEMY_ENGINE_OPTIONS from the DB_POOL_* / DB_PGBOUNCER settings."""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # in-memory SQLite lives in a single connection, keep SQLAlchemy's pool
+        return {}
+    options = {'pool_pre_ping': _flag(config.get('DB_POOL_PRE_PING', True))}
+    if _flag(config.get('DB_PGBOUNCER', False)):
+        # PgBouncer in transaction mode does the pooling and hands every
+        # transaction a different server connection, so keep no connections
+        # here and never rely on server-side prepared statements
+        options['poolclass'] = TimedNullPool
+        driver = url.get_driver_name()
+        if driver == 'psycopg':
+            options['connect_args'] = {'prepare_threshold': None}
+        elif driver == 'asyncpg':
+            options['connect_args'] = {'statement_cache_size': 0, 'prepared_statement_cache_size': 0}
+        return options
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=int(config.get('DB_POOL_SIZE', 5)),
+        max_overflow=int(config.get('DB_MAX_OVERFLOW', 10)),
+        pool_timeout=float(config.get('DB_POOL_TIMEOUT', 30)),
+        pool_recycle=int(config.get('DB_POOL_RECYCLE', -1)),
+    )
+    return options
+
+
+def init_pool(app):
+    # must run before db.init_app(), which creates the engines
+    options = engine_options(app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def pool_status(engine):
+    """Current occupancy and checkout statistics of ``engine``'s pool."""
+    pool = engine.pool
+    status = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        # max_overflow -1 lets the pool grow without limit
+        capacity = pool.size() + pool._max_overflow if pool._max_overflow >= 0 else 0
+        status.update(
+            size=pool.size(),
+            max_overflow=pool._max_overflow,
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            # share of the connections the pool may open that are in use
+            saturation=float(pool.checkedout()) / capacity if capacity > 0 else None,
+        )
+    if isinstance(pool, _TimedPool):
+        status.update(pool.stats.snapshot())
+    return status
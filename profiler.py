@@ -0,0 +1,151 @@
+import heapq
+import time
+
+from flask import (current_app, g, has_app_context, has_request_context, request, before_render_template,
+                   template_rendered)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#----------------------------------------------------------------------------#
+# Per-request profiler.
+#----------------------------------------------------------------------------#
+
+# statements are shortened to this many characters in the log
+STATEMENT_LOG_LENGTH = 500
+
+# environ key of the startup warm-up requests, which are not profiled
+WARM_UP = 'fyyur.warm_up'
+
+
+class RequestProfile(object):
+    """Where the time of one request went, in seconds."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = None
+        self.statements = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.slowest = []
+        # (template name, seconds) of every render
+        self.templates = []
+        self._renders = []
+
+    @property
+    def python_time(self):
+        return max(self.total - self.db_time - self.render_time, 0.0)
+
+    def server_timing(self):
+        return ', '.join([
+            'db;dur={:.1f};desc="{} queries"'.format(self.db_time * 1000, self.statements),
+            'render;dur={:.1f}'.format(self.render_time * 1000),
+            'app;dur={:.1f}'.format(self.python_time * 1000),
+            'total;dur={:.1f}'.format(self.total * 1000),
+        ])
+
+
+def current_profile():
+    return g.get('_profile') if has_request_context() else None
+
+
+class Profiler(object):
+    """Counts SQL statements and times database, template and Python work per request.
+
+    Requests slower than SLOW_REQUEST_MS are logged with their breakdown and
+    their slowest statements, and statements slower than SLOW_QUERY_MS are
+    logged on their own, both through ``app.logger`` (error.log outside
+    debug mode). With SERVER_TIMING on, every response carries the breakdown
+    in a ``Server-Timing`` header for the browser's network panel.
+
+    ``add_callback()`` registers a function called with every finished
+    profile of an app and its response.
+    """
+
+    def __init__(self, app=None):
+        # logs the slow statements run outside any app context
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        # settings and callbacks are per app, so a second app (a test, a
+        # benchmark) neither changes nor doubles the first one's
+        app.extensions['profiler'] = self
+        app.extensions['profiler_callbacks'] = []
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        # every engine, replicas included; listened to once per process
+        for name, listener in (('before_cursor_execute', self._before_execute),
+                               ('after_cursor_execute', self._after_execute)):
+            if not event.contains(Engine, name, listener):
+                event.listen(Engine, name, listener)
+
+    def add_callback(self, app, callback):
+        """Call ``callback(profile, response)`` after every profiled request of ``app``."""
+        app.extensions['profiler_callbacks'].append(callback)
+
+    def _before_request(self):
+        if not request.environ.get(WARM_UP):
+            g._profile = RequestProfile()
+
+    def _before_render(self, sender, template, context, **extra):
+        profile = current_profile()
+        if profile is not None:
+            profile._renders.append((time.perf_counter(), profile.db_time))
+
+    def _after_render(self, sender, template, context, **extra):
+        profile = current_profile()
+        if profile is not None and profile._renders:
+            started, db_time = profile._renders.pop()
+            # queries run from the template (lazy loads) count as db time
+            elapsed = time.perf_counter() - started - (profile.db_time - db_time)
+            profile.templates.append((template.name, elapsed))
+            if not profile._renders:
+                profile.render_time += elapsed
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('_query_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        app = current_app._get_current_object() if has_app_context() else self.app
+        if app is None:
+            return
+        profile = current_profile()
+        if profile is not None:
+            profile.statements += 1
+            profile.db_time += elapsed
+            # min-heap of the three slowest statements
+            if len(profile.slowest) < 3:
+                heapq.heappush(profile.slowest, (elapsed, statement))
+            elif elapsed > profile.slowest[0][0]:
+                heapq.heapreplace(profile.slowest, (elapsed, statement))
+        if elapsed >= app.config.get('SLOW_QUERY_MS', 100) / 1000.0:
+            app.logger.warning('slow query: %.1f ms%s\n%s', elapsed * 1000,
+                                    ' during %s %s' % (request.method, request.path) if has_request_context() else '',
+                                    statement[:STATEMENT_LOG_LENGTH])
+
+    def _after_request(self, response):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return response
+        profile.total = time.perf_counter() - profile.started
+        app = current_app._get_current_object()
+        if app.config.get('SERVER_TIMING', False):
+            response.headers['Server-Timing'] = profile.server_timing()
+        for callback in app.extensions['profiler_callbacks']:
+            callback(profile, response)
+        if profile.total >= app.config.get('SLOW_REQUEST_MS', 500) / 1000.0:
+            app.logger.warning(
+                'slow request: %s %s %d in %.1f ms (db %.1f ms in %d statements, render %.1f ms, python %.1f ms)%s',
+                request.method, request.full_path.rstrip('?'), response.status_code, profile.total * 1000,
+                profile.db_time * 1000, profile.statements, profile.render_time * 1000, profile.python_time * 1000,
+                ''.join('\n  %.1f ms: %s' % (elapsed * 1000, statement[:STATEMENT_LOG_LENGTH])
+                        for elapsed, statement in sorted(profile.slowest, reverse=True)))
+        return response
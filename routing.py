@@ -0,0 +1,175 @@
+import itertools
+import threading
+import time
+
+from flask import current_app, has_request_context, request, session as client_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+from pool import engine_options
+
+#----------------------------------------------------------------------------#
+# Read replica routing.
+#----------------------------------------------------------------------------#
+
+# GET/HEAD requests, and the views marked @read_only whatever their method
+# (the POST search forms), read from a replica; everything else, flushes,
+# CLI commands and a client's requests shortly after it wrote go to the primary
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# flask session key: until when (epoch seconds) this client reads from the primary
+PRIMARY_UNTIL = '_primary_until'
+
+
+class ReplicaRouter(object):
+    """Hands out replica engines round-robin, skipping the unhealthy ones.
+
+    A replica is probed with ``SELECT 1`` when it was not checked for
+    REPLICA_HEALTH_INTERVAL seconds, and a replica that fails a probe or
+    drops a connection is skipped for REPLICA_RETRY_AFTER seconds. With no
+    healthy replica left, reads fall back to the primary.
+    """
+
+    def __init__(self, db, keys, health_interval=10, retry_after=30):
+        self.db = db
+        self.keys = keys
+        self.health_interval = health_interval
+        self.retry_after = retry_after
+        self._turn = itertools.count()
+        self._checked = {}
+        self._down_until = {}
+        self._watched = set()
+        self._lock = threading.Lock()
+
+    def engine(self, key):
+        engine = self.db.engines[key]
+        if key not in self._watched:
+            # the engines only exist after db.init_app(), so hook them on first use
+            self._watched.add(key)
+
+            def handle_error(context):
+                # lost connections and failed connects take the replica out
+                if context.is_disconnect or context.connection is None:
+                    self.mark_down(key)
+
+            event.listen(engine, 'handle_error', handle_error)
+        return engine
+
+    def mark_down(self, key):
+        with self._lock:
+            self._down_until[key] = time.monotonic() + self.retry_after
+
+    def _probe(self, engine):
+        try:
+            with engine.connect() as connection:
+                connection.exec_driver_sql('SELECT 1')
+            return True
+        except Exception:
+            return False
+
+    def healthy(self, key):
+        now = time.monotonic()
+        with self._lock:
+            if self._down_until.get(key, 0) > now:
+                return False
+            due = self._checked.get(key, 0) + self.health_interval <= now
+            if due:
+                # other requests keep using it while this one probes
+                self._checked[key] = now
+        if due and not self._probe(self.engine(key)):
+            self.mark_down(key)
+            return False
+        return True
+
+    def choose(self):
+        """Return the next healthy replica's bind key, or None."""
+        for _ in range(len(self.keys)):
+            key = self.keys[next(self._turn) % len(self.keys)]
+            if self.healthy(key):
+                return key
+        return None
+
+    def status(self):
+        # None until a replica was first probed
+        now = time.monotonic()
+        with self._lock:
+            return dict((key, self._down_until.get(key, 0) <= now if key in self._checked else None)
+                        for key in self.keys)
+
+
+def read_only(view):
+    """Mark ``view`` as only reading, so it reads from a replica even when posted to."""
+    view.read_only = True
+    return view
+
+
+def reads_from_replica():
+    if not has_request_context():
+        return False
+    if request.method not in READ_METHODS:
+        view = current_app.view_functions.get(request.endpoint)
+        if not getattr(view, 'read_only', False):
+            return False
+    return client_session.get(PRIMARY_UNTIL, 0) <= time.time()
+
+
+class RoutingSession(Session):
+    """``db.session`` that sends the reads of GET requests to a replica.
+
+    The replica is picked once per session, so one request reads from a
+    single consistent replica. Flushes always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing:
+            router = current_app.extensions.get('replicas')
+            if router is not None and reads_from_replica():
+                if 'replica' not in self.info:
+                    self.info['replica'] = router.choose()
+                if self.info['replica'] is not None:
+                    return router.engine(self.info['replica'])
+        return super(RoutingSession, self).get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _after_flush(session, flush_context):
+    session.info['wrote'] = True
+
+
+def _after_commit(session):
+    # read-your-writes: the redirect that follows a create/edit, and whatever
+    # the client asks for next, read from the primary until the replicas caught up
+    if session.info.pop('wrote', False) and has_request_context():
+        window = current_app.config.get('REPLICA_READ_YOUR_WRITES', 5)
+        client_session[PRIMARY_UNTIL] = time.time() + window
+
+
+def _after_soft_rollback(session, previous_transaction):
+    session.info.pop('wrote', None)
+
+
+def init_replicas(app, db):
+    """Register SQLALCHEMY_REPLICA_URIS as binds; call after init_pool() and before db.init_app()."""
+    uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    if not uris:
+        return None
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    keys = []
+    for number, uri in enumerate(uris):
+        key = 'replica_{}'.format(number)
+        # SQLALCHEMY_ENGINE_OPTIONS only apply to the primary
+        options = engine_options(dict(app.config, SQLALCHEMY_DATABASE_URI=uri))
+        options['url'] = uri
+        binds[key] = options
+        keys.append(key)
+    app.config['SQLALCHEMY_BINDS'] = binds
+    router = ReplicaRouter(db, keys, app.config.get('REPLICA_HEALTH_INTERVAL', 10),
+                           app.config.get('REPLICA_RETRY_AFTER', 30))
+    app.extensions['replicas'] = router
+
+    # once per process, however many apps are created
+    for name, listener in (('after_flush', _after_flush), ('after_commit', _after_commit),
+                           ('after_soft_rollback', _after_soft_rollback)):
+        if not event.contains(RoutingSession, name, listener):
+            event.listen(RoutingSession, name, listener)
+    return router
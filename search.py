@@ -0,0 +1,239 @@
+from abc import ABC, abstractmethod
+
+from flask import current_app
+from sqlalchemy import text, or_, case
+
+from models import db, Venue, Artist, Genre, venue_genres, artist_genres
+from search_index import NgramIndex
+
+#----------------------------------------------------------------------------#
+# Search backends.
+#----------------------------------------------------------------------------#
+
+# columns matched by /venues/search and /artists/search, on top of the
+# names of the linked genres
+SEARCH_FIELDS = {
+    Venue: ('name', 'city'),
+    Artist: ('name', 'city'),
+}
+
+GENRE_LINKS = {
+    Venue: (venue_genres, 'venue_id'),
+    Artist: (artist_genres, 'artist_id'),
+}
+
+
+def _like_pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return '%{}%'.format(escaped)
+
+
+class SearchBackend(ABC):
+
+    @abstractmethod
+    def search(self, model, term, limit):
+        """The ``(id, name)`` rows of ``model`` matching ``term``, best first, at most ``limit``."""
+
+    def update(self, model, entity):
+        # called after a venue/artist is committed; database backends see the
+        # change through their indexes already
+        pass
+
+
+class LikeSearchBackend(SearchBackend):
+    """Portable fallback: case-insensitive substring match, name hits first."""
+
+    def search(self, model, term, limit):
+        pattern = _like_pattern(term)
+        columns = [getattr(model, field) for field in SEARCH_FIELDS[model]]
+        name_match = case((model.name.ilike(pattern, escape='\\'), 0), else_=1)
+        return db.session.query(model.id, model.name).filter(
+            or_(model.genre_list.any(Genre.name.ilike(pattern, escape='\\')),
+                *[column.ilike(pattern, escape='\\') for column in columns])
+        ).order_by(name_match, model.name, model.id).limit(limit).all()
+
+
+class PostgresSearchBackend(SearchBackend):
+    """pg_trgm + full-text search, served by the GIN indexes of migration 8d41e07c6a2f.
+
+    ILIKE '%term%' on a gin_trgm_ops column is answered from the trigram
+    index, and whole words are matched against the ``simple`` tsvector of
+    all searchable columns; rows are ranked by name similarity and ts_rank.
+    """
+
+    QUERY = '''
+        SELECT id, name FROM {table}
+        WHERE {like_clauses}
+           OR {document} @@ plainto_tsquery('simple', :term)
+           OR EXISTS (SELECT 1 FROM {links} JOIN genres ON genres.id = {links}.genre_id
+                      WHERE {links}.{owner} = {table}.id AND genres.name ILIKE :pattern)
+        ORDER BY (name ILIKE :pattern) DESC,
+                 similarity(name, :term) + ts_rank({document}, plainto_tsquery('simple', :term)) DESC,
+                 id
+        LIMIT :limit'''
+
+    @staticmethod
+    def document(fields):
+        # must stay identical to the expression indexed by the migration
+        return "to_tsvector('simple', {})".format(
+            " || ' ' || ".join("coalesce({}, '')".format(field) for field in fields))
+
+    def search(self, model, term, limit):
+        fields = SEARCH_FIELDS[model]
+        links, owner = GENRE_LINKS[model]
+        sql = self.QUERY.format(
+            table=model.__tablename__,
+            links=links.name,
+            owner=owner,
+            like_clauses=' OR '.join('{} ILIKE :pattern'.format(field) for field in fields),
+            document=self.document(fields))
+        return db.session.execute(text(sql), {
+            'term': term, 'pattern': _like_pattern(term), 'limit': limit
+        }).fetchall()
+
+
+class SqliteFtsSearchBackend(SearchBackend):
+    """SQLite FTS5 with the trigram tokenizer, used for development and tests.
+
+    Each searchable table gets an external-content ``<table>_fts`` index kept
+    in sync by triggers, created on first use. The trigram tokenizer gives
+    case-insensitive substring matches like ILIKE; terms shorter than three
+    characters cannot be matched through it and fall back to LIKE. Genre
+    matches, which live in another table, fill the results after the ranked
+    FTS hits.
+    """
+
+    def __init__(self):
+        self._ready = set()
+        self._fallback = LikeSearchBackend()
+
+    def ensure_schema(self, model):
+        table = model.__tablename__
+        if table in self._ready:
+            return
+        fields = SEARCH_FIELDS[model]
+        columns = ', '.join(fields)
+        new_values = ', '.join('new.' + field for field in fields)
+        old_values = ', '.join('old.' + field for field in fields)
+        fts = table + '_fts'
+        with db.engine.begin() as connection:
+            exists = connection.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+            ), {'name': fts}).first()
+            if not exists:
+                connection.execute(text(
+                    "CREATE VIRTUAL TABLE {fts} USING fts5({columns}, content='{table}', "
+                    "content_rowid='id', tokenize='trigram')".format(fts=fts, columns=columns, table=table)))
+                connection.execute(text(
+                    "CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+                    "INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END".format(
+                        fts=fts, table=table, columns=columns, new=new_values)))
+                connection.execute(text(
+                    "CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+                    "INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); END".format(
+                        fts=fts, table=table, columns=columns, old=old_values)))
+                connection.execute(text(
+                    "CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN "
+                    "INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); "
+                    "INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END".format(
+                        fts=fts, table=table, columns=columns, old=old_values, new=new_values)))
+                connection.execute(text("INSERT INTO {fts}({fts}) VALUES ('rebuild')".format(fts=fts)))
+        self._ready.add(table)
+
+    def search(self, model, term, limit):
+        if len(term) < 3:
+            return self._fallback.search(model, term, limit)
+        self.ensure_schema(model)
+        table = model.__tablename__
+        sql = '''
+            SELECT {table}.id, {table}.name FROM {table}_fts
+            JOIN {table} ON {table}.id = {table}_fts.rowid
+            WHERE {table}_fts MATCH :query
+            ORDER BY bm25({table}_fts), {table}.id
+            LIMIT :limit'''.format(table=table)
+        # the whole term is one quoted phrase so FTS5 operators are not interpreted
+        query = '"{}"'.format(term.replace('"', '""'))
+        results = db.session.execute(text(sql), {'query': query, 'limit': limit}).fetchall()
+        if len(results) < limit:
+            found = [row.id for row in results]
+            results += db.session.query(model.id, model.name).filter(
+                model.genre_list.any(Genre.name.ilike(_like_pattern(term), escape='\\')),
+                ~model.id.in_(found)
+            ).order_by(model.id).limit(limit - len(results)).all()
+        return results
+
+
+class MemorySearchBackend(SearchBackend):
+    """Serves searches from an in-process NgramIndex per model.
+
+    Each index is loaded from the database on first use (or by ``warm()``)
+    and kept current through ``update()``, which the create/edit handlers
+    call after committing.
+    """
+
+    BUILD_BATCH = 10000
+
+    def __init__(self):
+        self._indexes = {}
+
+    def _build(self, model):
+        index = NgramIndex()
+        links, owner = GENRE_LINKS[model]
+        owner_id = links.c[owner]
+        genres = {}
+        for entity_id, genre in db.session.query(owner_id, Genre.name).join(Genre, Genre.id == links.c.genre_id):
+            genres.setdefault(entity_id, []).append(genre)
+        fields = [getattr(model, field) for field in SEARCH_FIELDS[model]]
+        for row in db.session.query(model.id, *fields).yield_per(self.BUILD_BATCH):
+            index.add(*(tuple(row) + (' '.join(genres.get(row[0], ())),)))
+        return index
+
+    def index(self, model):
+        index = self._indexes.get(model)
+        if index is None:
+            index = self._indexes[model] = self._build(model)
+        return index
+
+    def warm(self):
+        for model in SEARCH_FIELDS:
+            self.index(model)
+
+    def search(self, model, term, limit):
+        return self.index(model).search(term, limit)
+
+    def update(self, model, entity):
+        if model in self._indexes:
+            values = [getattr(entity, field) for field in SEARCH_FIELDS[model]]
+            self._indexes[model].add(entity.id, *(values + [' '.join(entity.genres)]))
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SqliteFtsSearchBackend,
+    'like': LikeSearchBackend,
+    'memory': MemorySearchBackend,
+}
+
+
+def get_backend():
+    # SEARCH_BACKEND picks a backend explicitly, otherwise follow the database dialect
+    backend = current_app.extensions.get('search')
+    if backend is None:
+        name = current_app.config.get('SEARCH_BACKEND') or db.engine.dialect.name
+        backend = BACKENDS.get(name, LikeSearchBackend)()
+        current_app.extensions['search'] = backend
+    return backend
+
+
+def search(model, term, limit=None):
+    if limit is None:
+        limit = current_app.config['SEARCH_RESULTS_LIMIT']
+    term = (term or '').strip()
+    if not term:
+        # an empty search lists everything, one bounded page of it
+        return db.session.query(model.id, model.name).order_by(model.id).limit(limit).all()
+    return get_backend().search(model, term, limit)
+
+
+def update_index(model, entity):
+    get_backend().update(model, entity)
@@ -0,0 +1,155 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+#----------------------------------------------------------------------------#
+# In-memory n-gram index.
+#----------------------------------------------------------------------------#
+
+# the longest grams indexed; every 1- and 2-gram is indexed too, so a term
+# of up to GRAM characters is answered from its own postings list
+GRAM = 3
+
+Match = namedtuple('Match', ['id', 'name'])
+
+
+def normalize(value):
+    return ' '.join((value or '').lower().split())
+
+
+def _identity(value):
+    return value
+
+
+def grams(value, size=GRAM):
+    return {value[i:i + size] for i in range(len(value) - size + 1)}
+
+
+def indexed_grams(value):
+    return {value[i:i + size] for size in range(1, GRAM + 1) for i in range(len(value) - size + 1)}
+
+
+def _insert(postings, gram, doc_id):
+    ids = postings.get(gram)
+    if ids is None:
+        postings[gram] = array('I', [doc_id])
+    elif ids[-1] < doc_id:
+        # ids are mostly added in increasing order
+        ids.append(doc_id)
+    else:
+        ids.insert(bisect_left(ids, doc_id), doc_id)
+
+
+def _delete(postings, gram, doc_id):
+    ids = postings[gram]
+    del ids[bisect_left(ids, doc_id)]
+    if not ids:
+        del postings[gram]
+
+
+class _Tier(object):
+    # n-gram postings over one group of fields, plus the text they came from
+
+    def __init__(self, fold=normalize):
+        self.postings = {}
+        self.texts = []
+        self.fold = fold
+
+    def add(self, doc_id, value):
+        if doc_id >= len(self.texts):
+            self.texts.extend([None] * (doc_id + 1 - len(self.texts)))
+        self.texts[doc_id] = value
+        for gram in indexed_grams(self.fold(value)):
+            _insert(self.postings, gram, doc_id)
+
+    def remove(self, doc_id):
+        for gram in indexed_grams(self.fold(self.texts[doc_id])):
+            _delete(self.postings, gram, doc_id)
+        self.texts[doc_id] = None
+
+    def matches(self, term):
+        # yields ids whose text contains term, in increasing id order
+        if not term:
+            # everything matches; the caller stops at its limit
+            for doc_id, value in enumerate(self.texts):
+                if value is not None:
+                    yield doc_id
+            return
+        if len(term) <= GRAM:
+            # the term is itself an indexed gram: its postings are the matches
+            for doc_id in self.postings.get(term, ()):
+                yield doc_id
+            return
+        # every match is in the postings of each of the term's trigrams, so
+        # the shortest of them is a complete candidate list
+        candidates = None
+        for gram in grams(term):
+            ids = self.postings.get(gram)
+            if ids is None:
+                return
+            if candidates is None or len(ids) < len(candidates):
+                candidates = ids
+        fold = self.fold
+        texts = self.texts
+        for doc_id in candidates:
+            if term in fold(texts[doc_id]):
+                yield doc_id
+
+
+class NgramIndex(object):
+    """Substring index over short documents keyed by integer ids.
+
+    Every 1-, 2- and 3-gram maps to a sorted ``array('I')`` of document ids, four bytes
+    per posting, and the texts live in lists indexed by id, which stay compact
+    because database ids are dense. Names are kept as given (they are also
+    what is displayed) and the remaining fields pre-normalized; the two are
+    indexed separately so that name matches can rank first.
+
+    A term of up to three characters is answered from its own postings list.
+    A longer one walks the shortest postings list among its trigrams,
+    confirms each candidate with a substring test and stops as soon as enough
+    results are found, so no lookup scans the documents.
+    """
+
+    def __init__(self):
+        self._names = _Tier(fold=normalize)
+        self._fields = _Tier(fold=_identity)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return sum(1 for name in self._names.texts if name is not None)
+
+    def __contains__(self, doc_id):
+        return doc_id < len(self._names.texts) and self._names.texts[doc_id] is not None
+
+    def add(self, doc_id, name, *fields):
+        with self._lock:
+            self.remove(doc_id)
+            self._names.add(doc_id, name or '')
+            self._fields.add(doc_id, normalize(' '.join(field or '' for field in fields)))
+
+    def remove(self, doc_id):
+        with self._lock:
+            if doc_id in self:
+                self._names.remove(doc_id)
+                self._fields.remove(doc_id)
+
+    def search(self, term, limit):
+        """Return up to ``limit`` ``(id, name)`` matches containing ``term``.
+
+        Matches in the name come before matches in the other fields, each
+        group in id order.
+        """
+        term = normalize(term)
+        results = []
+        seen = set()
+        with self._lock:
+            for tier in (self._names, self._fields):
+                for doc_id in tier.matches(term):
+                    if len(results) == limit:
+                        return results
+                    if doc_id not in seen:
+                        seen.add(doc_id)
+                        results.append(Match(doc_id, self._names.texts[doc_id]))
+        return results
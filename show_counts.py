@@ -0,0 +1,168 @@
+import time
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, case, event, func, inspect, or_, select, update
+from sqlalchemy.orm import Session
+
+from models import db, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Denormalised show counters.
+#----------------------------------------------------------------------------#
+
+# venues and artists carry upcoming_shows_count, past_shows_count and
+# next_show_at (the start of their next show), so listings can show, filter
+# and sort on them without reading `shows`:
+# * a new show bumps the counters of its venue and artist in the same
+#   transaction (shows_added)
+# * a deleted or moved show recounts its venue and artist (recount)
+# * roll_forward() recounts the venues and artists whose next show has
+#   started, which moves that show from upcoming to past; run it
+#   periodically with `flask counts roll`
+
+counts_cli = AppGroup('counts', help='Upcoming/past show counters of venues and artists.')
+
+# (model, Show column pointing at it, position in a (venue_id, artist_id, start_time) tuple)
+OWNERS = ((Venue, Show.venue_id, 0), (Artist, Show.artist_id, 1))
+
+RECOUNT_CHUNK = 500
+
+
+def shows_added(connection, shows, now=None):
+    """Count new ``shows``, (venue_id, artist_id, start_time) tuples, in their owners' counters."""
+    now = now or datetime.now()
+    for model, _, position in OWNERS:
+        # per owner: [upcoming, past, earliest upcoming start]
+        deltas = {}
+        for show in shows:
+            delta = deltas.setdefault(int(show[position]), [0, 0, None])
+            start_time = show[2]
+            if start_time > now:
+                delta[0] += 1
+                delta[2] = start_time if delta[2] is None else min(delta[2], start_time)
+            else:
+                delta[1] += 1
+        if not deltas:
+            continue
+        table = model.__table__
+        next_at = bindparam('next_at', type_=table.c.next_show_at.type)
+        counters = dict(upcoming_shows_count=table.c.upcoming_shows_count + bindparam('upcoming'),
+                        past_shows_count=table.c.past_shows_count + bindparam('past'))
+        statement = update(table).where(table.c.id == bindparam('owner_id'))
+        upcoming = [{'owner_id': owner_id, 'upcoming': up, 'past': past, 'next_at': next_at_value}
+                    for owner_id, (up, past, next_at_value) in deltas.items() if next_at_value is not None]
+        past_only = [{'owner_id': owner_id, 'upcoming': up, 'past': past}
+                     for owner_id, (up, past, next_at_value) in deltas.items() if next_at_value is None]
+        if upcoming:
+            connection.execute(statement.values(next_show_at=case(
+                (or_(table.c.next_show_at.is_(None), table.c.next_show_at > next_at), next_at),
+                else_=table.c.next_show_at), **counters), upcoming)
+        if past_only:
+            connection.execute(statement.values(**counters), past_only)
+
+
+def recount(connection, model, criterion, now=None):
+    """Recompute the counters of the ``model`` rows matching ``criterion`` from `shows`."""
+    now = now or datetime.now()
+    table = model.__table__
+    owner = dict((owner_model, column) for owner_model, column, _ in OWNERS)[model]
+    shows = Show.__table__
+    owned = shows.c[owner.key] == table.c.id
+    statement = update(table).values(
+        upcoming_shows_count=select(func.count()).where(owned, shows.c.start_time > now).scalar_subquery(),
+        past_shows_count=select(func.count()).where(owned, shows.c.start_time <= now).scalar_subquery(),
+        next_show_at=select(func.min(shows.c.start_time)).where(owned, shows.c.start_time > now).scalar_subquery())
+    if criterion is not None:
+        statement = statement.where(criterion)
+    return connection.execute(statement).rowcount
+
+
+def recount_ids(connection, model, ids, now=None):
+    ids = sorted(set(int(owner_id) for owner_id in ids if owner_id is not None))
+    for start in range(0, len(ids), RECOUNT_CHUNK):
+        recount(connection, model, model.__table__.c.id.in_(ids[start:start + RECOUNT_CHUNK]), now)
+
+
+def roll_forward(connection, now=None):
+    """Move shows that have started from upcoming to past; returns the number of rows recounted."""
+    now = now or datetime.now()
+    return sum(recount(connection, model, model.__table__.c.next_show_at <= now, now)
+               for model, _, _ in OWNERS)
+
+
+def rebuild(connection, now=None):
+    """Recount every venue and artist, e.g. after rows were written around the ORM."""
+    now = now or datetime.now()
+    return sum(recount(connection, model, None, now) for model, _, _ in OWNERS)
+
+
+def _counted_under(show):
+    # (venue ids, artist ids) a changed show was counted under before this
+    # flush, or None when its venue, artist and start time are unchanged
+    state = inspect(show)
+    history = dict((name, state.attrs[name].history) for name in ('venue_id', 'artist_id', 'start_time'))
+    if not any(changes.has_changes() for changes in history.values()):
+        return None
+    return list(history['venue_id'].deleted), list(history['artist_id'].deleted)
+
+
+def _after_flush(session, flush_context):
+    added = [show for show in session.new if isinstance(show, Show)]
+    recounts = ([], [])
+    for show in session.deleted:
+        if isinstance(show, Show):
+            recounts[0].append(show.venue_id)
+            recounts[1].append(show.artist_id)
+    for show in session.dirty:
+        if isinstance(show, Show) and show not in session.deleted:
+            previous = _counted_under(show)
+            if previous is not None:
+                recounts[0].extend(previous[0] + [show.venue_id])
+                recounts[1].extend(previous[1] + [show.artist_id])
+    if not added and not any(recounts):
+        return
+    # the flush runs on the primary, in the transaction that wrote the shows
+    connection = session.connection()
+    now = datetime.now()
+    if added:
+        shows_added(connection, [(show.venue_id, show.artist_id, show.start_time) for show in added], now)
+    for (model, _, _), ids in zip(OWNERS, recounts):
+        if ids:
+            recount_ids(connection, model, ids, now)
+
+
+def maintain_on_flush():
+    """Keep the counters up to date whenever a session flushes shows."""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+
+
+#  Commands
+#  ----------------------------------------------------------------
+
+@counts_cli.command('roll')
+@click.option('--every', type=int, help='Keep running, rolling forward every this many seconds.')
+def roll_command(every):
+    """Move the shows that have started from the upcoming to the past counters."""
+    while True:
+        with db.engine.begin() as connection:
+            recounted = roll_forward(connection)
+        if recounted:
+            # core updates bypass the ORM session events that invalidate the cache
+            current_app.extensions['fragment_cache'].clear()
+        click.echo('{} venues and artists rolled forward'.format(recounted))
+        if not every:
+            return
+        time.sleep(every)
+
+
+@counts_cli.command('rebuild')
+def rebuild_command():
+    """Recompute the counters of every venue and artist from the shows table."""
+    with db.engine.begin() as connection:
+        recounted = rebuild(connection)
+    current_app.extensions['fragment_cache'].clear()
+    click.echo('{} venues and artists recounted'.format(recounted))
@@ -0,0 +1,127 @@
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for, jsonify
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager
+
+from models import db, Artist, Venue, Show
+from forms import ShowForm, validate_shows, formdata
+from conflicts import record_shows
+from helpers import paginate
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+bp = Blueprint('shows', __name__, url_prefix='/shows')
+
+@bp.route('')
+def shows():
+  # displays list of shows at /shows
+  # TODO: replace with real venues data.
+  #       num_shows should be aggregated based on number of upcoming shows per venue.
+
+  # getting one page of shows joining the venue and artist
+  # contains_eager fills show.venue / show.artist from the joined columns
+  # instead of lazy loading them once per row
+  shows = paginate(
+    Show.query.join(Venue).join(Artist).options(contains_eager(Show.venue), contains_eager(Show.artist)),
+    [Show.start_time, Show.id])
+
+  #declaring and initializing the data array
+  data = []
+
+  #populating the data array with the relevant data to show
+  for show in  shows:
+    d = {
+      'venue_name':show.venue.name,
+      'venue_id':show.venue.id,
+      'artist_id':show.artist.id,
+      'artist_name':show.artist.name,
+      'artist_image_link':show.artist.image_link,
+      'start_time':show.start_time
+    }
+    data.append(d)  
+
+  return render_template('pages/shows.html', shows=data, page=shows)
+
+@bp.route('/create')
+def create_shows():
+  # renders form. do not touch.
+  form = ShowForm()
+  return render_template('forms/new_show.html', form=form)
+
+@bp.route('/create', methods=['POST'])
+def create_show_submission():
+  # called to create new shows in the db, upon submitting new show listing form
+  # TODO: insert form data as a new Show record in the db, instead
+  error = False
+  form = ShowForm(request.form)
+  if(form.validate()):
+    print("form validated")
+    booking = form.booking()
+    show = Show(
+      artist_id = booking.artist_id,
+      venue_id = booking.venue_id,
+      start_time = booking.start_time,
+      end_time = booking.end_time
+    )
+    try:
+      db.session.add(show)
+      db.session.flush()
+      row = (show.id,) + tuple(booking)
+      db.session.commit()
+      record_shows([row])
+    except IntegrityError:
+      # on PostgreSQL the exclusion constraints catch a booking made
+      # concurrently since the check
+      db.session.rollback()
+      error = 'This show overlaps another booking of the artist or the venue'
+    except:
+      db.session.rollback()
+      error = 'An Error Occurred ! Unable to add Show'
+    finally:
+      db.session.close()
+    if(error):
+      flash(error)
+    else:
+      flash('Show was successfully listed!')  
+    return redirect(url_for('index'))  
+
+  else:
+    return render_template('forms/new_show.html',form=form)
+
+@bp.route('/batch', methods=['POST'])
+def create_shows_batch():
+  # schedules many shows from one JSON request, either a list or {"shows": [...]}
+  # of {"artist_id", "venue_id", "start_time"}. the artists and venues of the
+  # whole batch are checked with one query and the shows are inserted in one
+  # transaction: nothing is saved unless every show is valid
+  payload = request.get_json(silent=True)
+  items = payload.get('shows') if isinstance(payload, dict) else payload
+  if not isinstance(items, list) or not items:
+    return jsonify({'error': 'expected a non-empty JSON list of shows'}), 400
+  if len(items) > current_app.config['SHOW_BATCH_LIMIT']:
+    return jsonify({'error': 'at most {} shows per request'.format(current_app.config['SHOW_BATCH_LIMIT'])}), 413
+
+  # a missing start_time must not fall back to the form's default
+  forms = [ShowForm(formdata=formdata(dict({'start_time': ''}, **item)), meta={'csrf': False})
+           if isinstance(item, dict) else None for item in items]
+  if None in forms:
+    return jsonify({'error': 'every show must be a JSON object'}), 400
+  if not validate_shows(forms):
+    errors = dict((index, form.errors) for index, form in enumerate(forms) if form.errors)
+    return jsonify({'errors': errors}), 400
+
+  shows = [Show(**form.booking()._asdict()) for form in forms]
+  try:
+    db.session.add_all(shows)
+    db.session.flush()
+    ids = [show.id for show in shows]
+    db.session.commit()
+    record_shows([(show_id,) + tuple(form.booking()) for show_id, form in zip(ids, forms)])
+  except IntegrityError:
+    # an artist or venue was deleted, or a conflicting show booked, after the check
+    db.session.rollback()
+    return jsonify({'error': 'an artist or venue no longer exists, or a show was booked meanwhile'}), 409
+  finally:
+    db.session.close()
+  return jsonify({'count': len(ids), 'ids': ids}), 201
@@ -0,0 +1,93 @@
+import os
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from jinja2 import FileSystemBytecodeCache
+
+from models import db, Venue, Artist
+from profiler import WARM_UP
+
+#----------------------------------------------------------------------------#
+# Template bytecode cache and warm-up.
+#----------------------------------------------------------------------------#
+
+# `flask templates compile` writes the compiled templates to
+# TEMPLATE_CACHE_DIR at build/deploy time; every worker then loads them from
+# there instead of compiling them again. warm_render() renders the pages once
+# at startup, so the first visitors after a deploy or a scale-up do not pay
+# for loading templates and building the per-page state
+
+templates_cli = AppGroup('templates', help='Compiled template cache.')
+
+# pages warm_render() requests; detail and edit pages of the first venue and
+# artist are added when there is one
+WARM_PATHS = ('/', '/venues', '/artists', '/shows', '/venues/create', '/artists/create', '/shows/create')
+
+
+class BytecodeCache(FileSystemBytecodeCache):
+    """Jinja's file system cache, usable from a read-only directory.
+
+    A deploy that ships the compiled templates may mount them read-only:
+    templates missing from the cache are then compiled in memory instead of
+    failing the render.
+    """
+
+    def dump_bytecode(self, bucket):
+        try:
+            FileSystemBytecodeCache.dump_bytecode(self, bucket)
+        except OSError:
+            pass
+
+
+def init_template_cache(app):
+    """Load compiled templates from TEMPLATE_CACHE_DIR, when set."""
+    directory = app.config.get('TEMPLATE_CACHE_DIR')
+    if not directory:
+        return
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        pass
+    app.jinja_env.bytecode_cache = BytecodeCache(directory)
+
+
+def compile_templates(app):
+    """Compile every template, filling the bytecode cache; returns their names."""
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return names
+
+
+def warm_render(app):
+    """Request every page that needs no form post once, outside the metrics and logs."""
+    paths = list(WARM_PATHS)
+    with app.app_context():
+        venue_id = db.session.query(Venue.id).order_by(Venue.id).limit(1).scalar()
+        artist_id = db.session.query(Artist.id).order_by(Artist.id).limit(1).scalar()
+        db.session.remove()
+    if venue_id is not None:
+        paths += ['/venues/%d' % venue_id, '/venues/%d/edit' % venue_id]
+    if artist_id is not None:
+        paths += ['/artists/%d' % artist_id, '/artists/%d/edit' % artist_id]
+    client = app.test_client()
+    statuses = {}
+    for path in paths:
+        response = client.get(path, environ_base={WARM_UP: True})
+        statuses[path] = response.status_code
+        response.close()
+    return statuses
+
+
+#  Commands
+#  ----------------------------------------------------------------
+
+@templates_cli.command('compile')
+def compile_command():
+    """Compile every template into TEMPLATE_CACHE_DIR (run at build/deploy time)."""
+    if current_app.jinja_env.bytecode_cache is None:
+        raise click.UsageError('TEMPLATE_CACHE_DIR is not set')
+    names = compile_templates(current_app)
+    click.echo('{} templates compiled into {}'.format(len(names), current_app.config['TEMPLATE_CACHE_DIR']))
+
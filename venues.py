@@ -0,0 +1,243 @@
+import itertools
+
+from flask import Blueprint, render_template, request, flash, redirect, url_for
+from sqlalchemy import func
+from sqlalchemy.orm import contains_eager
+
+from models import db, Artist, Venue, Show
+from forms import VenueForm
+from search import search, update_index
+from conditional import conditional
+from extensions import fragment_cache
+from helpers import paginate, filter_by_upcoming, filter_by_genre, page_version, split_shows
+from routing import read_only
+
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+bp = Blueprint('venues', __name__, url_prefix='/venues')
+
+
+def venue_version(venue_id):
+  return page_version(Venue, Venue.updated_at, Show.venue_id, Artist, Show.artist_id, venue_id)
+
+@bp.route('')
+@fragment_cache.cached('pages/venues.html')
+def venues():
+  # every venue of the page with its number of upcoming shows, from the
+  # venue's counters; ordered so that venues of the same city/state are adjacent
+  venue_rows = db.session.query(
+      Venue.id, Venue.name, Venue.city, Venue.state, Venue.upcoming_shows_count.label('num_upcoming_shows')
+    )
+  venue_rows = filter_by_upcoming(filter_by_genre(venue_rows, Venue.genre_list), Venue)
+  page = paginate(venue_rows, [Venue.state, Venue.city, Venue.id])
+
+  #grouping the venues by city and state
+  areas = []
+  for (state, city), rows in itertools.groupby(page.items, key=lambda row: (row.state, row.city)):
+    areas.append({
+      'city':city,
+      'state':state,
+      'venues':[{
+        'id':row.id,
+        'name':row.name,
+        'num_upcoming_shows':row.num_upcoming_shows
+      } for row in rows]
+    })
+
+  data = {
+    "count":filter_by_upcoming(filter_by_genre(db.session.query(func.count(Venue.id)), Venue.genre_list), Venue).scalar(),
+    "genre":request.args.get('genre'),
+    "upcoming":request.args.get('upcoming'),
+    "areas":areas,
+    "page":page
+  }
+
+  return render_template('fragments/venues.html', data=data)
+
+@bp.route('/search', methods=['POST'])
+@read_only
+def search_venues():
+  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
+  # seach for Hop should return "The Musical Hop".
+  # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+
+  # ranked, bounded search over name, city and genres
+  venues = search(Venue, request.form.get('search_term'))
+
+  response = {
+    "count":len(venues), #getting length of the returned venues
+    "data":venues 
+  }
+
+  return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+
+@bp.route('/<int:venue_id>')
+@conditional(venue_version)
+def show_venue(venue_id):
+  # shows the venue page with the given venue_id
+  # TODO: replace with real venue data from the venues table, using venue_id
+  venue = Venue.query.get(venue_id)
+
+  if(venue is None):
+    return render_template("errors/404.html")
+  
+
+  # one query for all the venue's shows, split into past/upcoming in python
+  shows_query = Show.query.join(Artist).options(contains_eager(Show.artist)).filter(Show.venue_id==venue_id).order_by(Show.start_time).all()
+  past_shows, upcoming_shows = split_shows([{
+      'artist_id':show.artist_id,
+      'artist_name':show.artist.name,
+      'artist_image_link':show.artist.image_link,
+      'start_time':show.start_time
+    } for show in shows_query])
+
+  data = {
+    'id':venue.id,
+    'name':venue.name,
+    'genres':venue.genres,
+    'address':venue.address,
+    'city':venue.city,
+    'state':venue.state,
+    'phone':venue.phone,
+    'website':venue.website_link,
+    'facebook_link':venue.facebook_link,
+    'image_link':venue.image_link,
+    'seeking_talent':venue.seeking_talent,
+    'seeking_description':venue.seeking_description,
+    'past_shows':past_shows,
+    'past_shows_count':len(past_shows),
+    'upcoming_shows':upcoming_shows,
+    'upcoming_shows_count':len(upcoming_shows)
+  }
+
+  return render_template('pages/show_venue.html', venue=data)
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@bp.route('/create', methods=['GET'])
+def create_venue_form():
+
+  
+  form = VenueForm()
+  return render_template('forms/new_venue.html', form=form)
+
+@bp.route('/create', methods=['POST'])
+def create_venue_submission():
+  # TODO: insert form data as a new Venue record in the db, instead
+  # TODO: modify data to be the data object returned from db insertion
+  error = False
+  form = VenueForm(request.form)
+  if(form.validate()):
+    venue = Venue(
+      name = form.name.data,
+      city = form.city.data,
+      state = form.state.data,
+      address = form.address.data,
+      phone = form.phone.data,
+      facebook_link = form.facebook_link.data,
+      seeking_talent = form.seeking_talent.data,
+      seeking_description = form.seeking_description.data,
+      image_link = form.image_link.data,
+      website_link = form.website_link.data,
+      genres = form.genres.data
+    )
+    print(venue)
+    try:
+      db.session.add(venue)
+      db.session.commit()
+    except:
+      db.session.rollback()
+      error =True
+    else:
+      update_index(Venue, venue)
+    finally:
+      db.session.close()
+    if(error):
+      flash('Venue ' + request.form['name'] + ' not listed!')
+    else:
+      flash('Venue ' + request.form['name'] + ' successfully listed!')
+    return redirect(url_for('venues.venues'))
+  else:
+    return render_template("forms/new_venue.html",form=form)
+  
+  
+  # on successful db insert, flash success
+  
+  # TODO: on unsuccessful db insert, flash an error instead.
+  # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+  # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+  
+
+@bp.route('/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+  # TODO: Complete this endpoint for taking a venue_id, and using
+  # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+
+  # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+  # clicking that button delete it from the db then redirect the user to the homepage
+  return None
+
+#  Update
+#  ----------------------------------------------------------------
+
+@bp.route('/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+
+  venue = Venue.query.get(venue_id)
+
+  if(venue is None):
+    return render_template('errors/404.html')
+  
+
+  form = VenueForm(
+    id = venue.id,
+    name = venue.name,
+    genres = venue.genres,
+    state = venue.state,
+    city = venue.city,
+    phone = venue.phone,
+    address= venue.address,
+    website_link = venue.website_link,
+    facebook_link  = venue.facebook_link,
+    seeking_talent = venue.seeking_talent,
+    seeking_description = venue.seeking_description,
+    image_link = venue.image_link
+    
+    )
+ 
+  return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+@bp.route('/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+  
+  error = False
+  venue = Venue.query.get(venue_id)
+  if venue is None:
+    return render_template("errors/404.html")
+  
+
+  form = VenueForm(request.form,obj=venue)
+  if(form.validate()):
+    form.populate_obj(venue)
+  else:
+    return render_template("forms/edit_venue.html",venue=venue,form=form)
+
+  try:
+    db.session.commit()
+  except:
+    db.session.rollback()
+    error = True
+  else:
+    update_index(Venue, venue)
+  finally:
+    db.session.close()
+
+  if(error):
+      flash("Unable to update the venue")
+  else:
+      flash("Venue update Successfully ")
+
+  return redirect(url_for('venues.show_venue', venue_id=venue_id))
@@ -0,0 +1,64 @@
+import os
+
+from sqlalchemy.orm import configure_mappers
+
+from models import db
+from search import get_backend
+from conflicts import get_checker
+from template_cache import compile_templates, warm_render
+
+#----------------------------------------------------------------------------#
+# Production WSGI entry point.
+#----------------------------------------------------------------------------#
+
+#   SECRET_KEY=... DATABASE_URL=... gunicorn -c gunicorn.conf.py wsgi:application
+#
+# gunicorn.conf.py preloads this module in the master process, so the app is
+# imported, checked and warmed once and the forked workers share it
+# copy-on-write instead of each paying for it on their first requests
+
+
+def check_config(config):
+    """Refuse settings that are only fit for development."""
+    if config['DEBUG']:
+        raise RuntimeError('DEBUG is on: the debugger would be reachable from the network')
+    if not os.environ.get('SECRET_KEY'):
+        raise RuntimeError('SECRET_KEY is not set: each worker would sign sessions and CSRF tokens '
+                           'with its own random key')
+
+
+def warm(app):
+    """Build what every request needs before the workers are forked."""
+    configure_mappers()
+    # compiled templates stay in the environment's cache
+    compile_templates(app)
+    with app.app_context():
+        # the in-process search index and booking index, when configured
+        for backend in (get_backend(), get_checker()):
+            if hasattr(backend, 'warm'):
+                backend.warm()
+    if not app.extensions['assets']:
+        app.logger.warning('static assets are not built: run `flask assets build` before deploying')
+    warm_render(app)
+    with app.app_context():
+        # connections opened while warming must not be shared by the workers
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def after_fork(app):
+    # a worker opens its own connections; close=False leaves the parent's alone
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def create_app():
+    from app import create_app as create_fyyur_app
+    app = create_fyyur_app()
+    check_config(app.config)
+    warm(app)
+    return app
+
+
+application = create_app()